@@ -0,0 +1,101 @@
+"""Program Description
+
+The repetition.py program compares the vectorized repetition labeling
+with the original loop over the correlation matrix. Synthetic matrices
+are used, one for a short song and one for a song close to the max
+length that the game accepts.
+
+Usage: python benchmark/repetition.py
+"""
+
+import os, sys
+import time
+import numpy as np
+path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if path not in sys.path:
+    sys.path.append(path)
+from model.music import label_repetition, REPETITION_INTERVAl
+
+# the duration of one segment in sec with the default hop length
+SEG_LENGTH = 4096 / 22050
+MIN_REPETITION = int(3 // SEG_LENGTH)
+# num of segments of a 3 min song and a 1000 sec song
+SIZES = {'short': int(180 / SEG_LENGTH), 'long': int(1000 / SEG_LENGTH)}
+
+def label_repetition_loop(R, min_repetition):
+    """The original labeling that walks through R with python loops."""
+    indices = np.arange(min_repetition, dtype=int)
+    width = min_repetition + REPETITION_INTERVAl
+    repetition = np.zeros(R.shape[0], dtype=int)
+    current_category = 1
+
+    def __set_patterns(index_i, index_j, category):
+        repetition[indices+index_i] = category
+        repetition[indices+index_j] = category
+        index_i += min_repetition
+        index_j += min_repetition
+        while index_j < R.shape[0] and R[index_i,index_j]:
+            repetition[index_i] = category
+            repetition[index_j] = category
+            index_i += 1
+            index_j += 1
+
+    i = 0
+    while i < R.shape[0] - min_repetition:
+        if repetition[indices+i].any():
+            i += 1
+            continue
+        j = i + width
+        while j < R.shape[0] - min_repetition:
+            if not repetition[indices+j].any() and R[(indices+i,indices+j)].all():
+                if not repetition[i]:
+                    category = current_category
+                    current_category += 1
+                else:
+                    category = repetition[i]
+                __set_patterns(i, j, category)
+                j += min_repetition
+            j += 1
+        i += 1
+    return repetition
+
+def synthetic_recurrence(size, section=None, seed=0):
+    """Generate a symmetric correlation matrix of a song made of repeated sections.
+
+    Arguments:
+        size: The num of segments.
+        section: The num of segments in a section, random if None.
+        seed: The seed of the random generator.
+    Returns:
+        A boolean correlation matrix.
+    """
+
+    rng = np.random.default_rng(seed)
+    # sparse noise as nearest neighbors of unrelated segments
+    R = rng.random((size, size)) < 2 / np.sqrt(size)
+    # repeated sections as diagonal runs
+    position = 0
+    while position < size:
+        length = section if section else int(rng.integers(2, 6) * MIN_REPETITION)
+        for repeat in range(position + length + REPETITION_INTERVAl, size, 2 * length):
+            run = np.arange(min(length, size - repeat))
+            R[position + run, repeat + run] = rng.random(run.shape[0]) < 0.97
+        position += 3 * length
+    R = R | R.T
+    np.fill_diagonal(R, False)
+    return R
+
+def measure(function, *args):
+    """Run a function and return its result and elapsed time in sec."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+if __name__ == '__main__':
+    for name, size in SIZES.items():
+        R = synthetic_recurrence(size)
+        loop_result, loop_time = measure(label_repetition_loop, R, MIN_REPETITION)
+        result, vector_time = measure(label_repetition, R, MIN_REPETITION)
+        print('%-5s %5d segments: loop %8.3fs  vectorized %8.4fs  speedup %7.1fx  identical %s'
+              % (name, size, loop_time, vector_time, loop_time / vector_time,
+                 np.array_equal(loop_result, result)))
@@ -0,0 +1,296 @@
+"""Program Description
+
+The suite.py program measures the hot paths of the music analysis,
+the chart generation and the rendering on a synthetic song, writes the
+results as json and compares them with a stored baseline, so that
+changes that slow the game down are flagged. Results are only compared
+with a baseline measured on the same machine and interpreter, and
+updating the baseline with a few benchmarks keeps the others.
+
+The baseline is not kept in the repository, since it only holds on the
+machine it is measured on. Record it before a change with
+--update-baseline, then run the suite again after the change.
+
+The analysis cache is kept in a temporary folder, thus analyses are
+measured from scratch unless a benchmark is about the cache itself.
+
+Usage: python benchmark/suite.py [-b name ...] [-r repeat] [--duration 120] [--phrase 8]
+                                 [-o results.json] [--baseline file] [--threshold 0.25]
+                                 [--update-baseline]
+"""
+
+import os, sys
+# render on the dummy driver before pygame is initiated
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import json
+import time
+import argparse
+import platform
+import tempfile
+import numpy as np
+import pygame
+path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if path not in sys.path:
+    sys.path.append(path)
+from model.setting import FRAME_RATE, DefaultSetting, Keyset
+from model.cache import ANALYSIS_CACHE
+from model.music import Song, MusicAnalyzer, retrieve_repetition, analyze_stream
+from model.patterns import generate_patterns
+from model.chart import compile_chart, generate_stress_chart
+from model.circles import CircleHandler
+from model.track import create_tracks
+from model.score_circles import score_miss
+from model.audio_visualizer import AudioVisualizer
+from render import render_all_tracks, render_track
+from synthetic_audio import write_song
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# the ratio that a benchmark may be slower than the baseline by
+DEFAULT_THRESHOLD = 0.25
+# num of times every benchmark runs, the min of which is compared
+DEFAULT_REPEAT = 5
+# num of frames rendered by the benchmarks of a frame
+FRAME_NUM = 1000
+# num of beats of the charts being compiled
+BEAT_NUM = 5000
+# num of beats per sec of the chart being played, and of a dense chart with chords
+CHART_DENSITY = 20
+DENSE_CHART_DENSITY = 40
+DENSE_CHORD_SIZE = 3
+# num of patterns being generated
+PATTERN_NUM = 100
+SCREEN_SIZE = DefaultSetting.LARGE_SCREEN_SIZE
+MODE = Keyset.EIGHT_KEYS
+
+def get_frame_times():
+    """Get the music time in ms of every frame."""
+    return np.arange(FRAME_NUM) * 1000 / FRAME_RATE
+
+def get_playing_tracks(density=CHART_DENSITY, chord_size=1, size=SCREEN_SIZE):
+    """Get the tracks and the circle handler of a chart in 8 keys."""
+    key_num = len(MODE)
+    track_width = size[0] // (key_num + 1)
+    track_height = size[1] - track_width // 2
+    positions = [(track_width * index, -track_width) for index in range(1, key_num + 1)]
+    tracks = create_tracks(track_width, track_height, positions)
+    velocity = DefaultSetting.MEDIUM_VELOCITY
+    chart = generate_stress_chart(FRAME_NUM / FRAME_RATE + 10, key_num, density, chord_size)
+    handler = CircleHandler(chart, track_height / velocity)
+    handler.seek(0)
+    return tracks, handler, velocity
+
+def bench_retrieve_repetition(song):
+    music, freq = song.load()
+    return lambda: retrieve_repetition(music, freq)
+
+def bench_analyzer_analyze(song):
+    song.load()
+    return lambda: MusicAnalyzer.analyze(song)
+
+def bench_analyzer_load(song):
+    # the first load fills the cache, the rest are read from it
+    MusicAnalyzer().load(song)
+    return lambda: MusicAnalyzer().load(song)
+
+def bench_analyze_stream(song):
+    return lambda: analyze_stream(song)
+
+def bench_get_band_decibels(song):
+    analyzer = MusicAnalyzer()
+    analyzer.load(song)
+    frame_times = get_frame_times().tolist()
+    def run():
+        for frame_time in frame_times:
+            analyzer.get_band_decibels(frame_time)
+    return run
+
+def bench_generate_patterns(song):
+    def run():
+        for _ in range(PATTERN_NUM):
+            generate_patterns()
+    return run
+
+def bench_compile_chart(song):
+    beats = np.arange(BEAT_NUM) * 300.4
+    patterns = np.repeat(np.arange(BEAT_NUM // 20) % 12, 20)
+    return lambda: compile_chart(beats, patterns, MODE)
+
+def bench_update_circles(song):
+    def run():
+        tracks, handler, velocity = get_playing_tracks()
+        for frame_time in get_frame_times():
+            # the handler advances the shared board once per frame
+            handler.update_circles(frame_time, velocity, tracks)
+            score_miss(tracks, frame_time)
+    return run
+
+def bench_render_all_tracks(song, density=CHART_DENSITY, chord_size=1, size=SCREEN_SIZE,
+                            one_by_one=False):
+    tracks, handler, velocity = get_playing_tracks(density, chord_size, size)
+    handler.update_circles(0, velocity, tracks)
+    screen = pygame.display.set_mode(size)
+    width = tracks[1].width
+    key_img = pygame.Surface((width, width), pygame.SRCALPHA)
+    pygame.draw.rect(key_img, (200, 200, 200), key_img.get_rect(), border_radius=width // 4)
+    circle_img = pygame.Surface((width, width), pygame.SRCALPHA)
+    pygame.draw.circle(circle_img, (255, 255, 255), (width // 2, width // 2), width // 2)
+    key_imgs = [key_img] * len(tracks)
+    def run():
+        for _ in range(FRAME_NUM // 10):
+            render_all_tracks(tracks, key_imgs, circle_img, screen)
+    def run_one_by_one():
+        for _ in range(FRAME_NUM // 10):
+            for track, key_img in zip(tracks.values(), key_imgs):
+                render_track(track, key_img, circle_img, screen)
+    return run_one_by_one if one_by_one else run
+
+def bench_render_all_tracks_dense(song, one_by_one=False):
+    # small circles, thus the cost of every blit call weighs more than filling pixels
+    return bench_render_all_tracks(song, DENSE_CHART_DENSITY, DENSE_CHORD_SIZE,
+                                   DefaultSetting.SMALL_SCREEN_SIZE, one_by_one)
+
+def bench_render_tracks_one_by_one_dense(song):
+    # circles blitted track by track, to compare with the batched blits
+    return bench_render_all_tracks_dense(song, one_by_one=True)
+
+def bench_visualizer_render(song):
+    screen = pygame.display.set_mode(SCREEN_SIZE)
+    visualizer = AudioVisualizer(SCREEN_SIZE, song)
+    frame_times = get_frame_times().tolist()
+    def run():
+        for frame_time in frame_times:
+            visualizer.render(screen, frame_time)
+    return run
+
+# benchmarks by their names, each of them sets up and returns the function to measure
+BENCHMARKS = {
+    'retrieve_repetition': bench_retrieve_repetition,
+    'analyzer_analyze': bench_analyzer_analyze,
+    'analyzer_load_cached': bench_analyzer_load,
+    'analyze_stream': bench_analyze_stream,
+    'get_band_decibels_%d_frames' % FRAME_NUM: bench_get_band_decibels,
+    'generate_patterns_%d' % PATTERN_NUM: bench_generate_patterns,
+    'compile_chart_%d_beats' % BEAT_NUM: bench_compile_chart,
+    'update_circles_%d_frames' % FRAME_NUM: bench_update_circles,
+    'render_all_tracks_%d_frames' % (FRAME_NUM // 10): bench_render_all_tracks,
+    'render_all_tracks_dense_%d_frames' % (FRAME_NUM // 10): bench_render_all_tracks_dense,
+    'render_tracks_one_by_one_dense_%d_frames' % (FRAME_NUM // 10): bench_render_tracks_one_by_one_dense,
+    'visualizer_render_%d_frames' % FRAME_NUM: bench_visualizer_render,
+}
+
+def measure(function, repeat):
+    """Run a function several times.
+
+    Returns:
+        A dict of the min and the median of the elapsed time in ms.
+    """
+
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed.append((time.perf_counter() - start) * 1000)
+    return {'min_ms': min(elapsed), 'median_ms': float(np.median(elapsed))}
+
+def get_machine():
+    """Get the machine and the interpreter that benchmarks run on."""
+    return {'python': platform.python_version(), 'numpy': np.__version__,
+            'platform': platform.platform(), 'processor': platform.machine()}
+
+def compare(results, baseline, threshold):
+    """Compare the results with the baseline by the min time. The spread
+    between the median and the min of either run is taken as the noise
+    of a benchmark, which a benchmark may be slower by on top of the
+    threshold.
+
+    Returns:
+        A list of tuples of the name, the baseline time and the time
+        of benchmarks slower than the baseline by over the threshold
+        and the noise.
+    """
+
+    regressions = []
+    for name, result in results.items():
+        if name in baseline:
+            baseline_time = baseline[name]['min_ms']
+            noise = max(result['median_ms'] - result['min_ms'],
+                        baseline[name]['median_ms'] - baseline_time)
+            if result['min_ms'] > baseline_time * (1 + threshold) + noise:
+                regressions.append((name, baseline_time, result['min_ms']))
+    return regressions
+
+def parse_arguments(argv):
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark the hot paths of the game.')
+    parser.add_argument('-b', '--benchmarks', nargs='+', choices=list(BENCHMARKS),
+                        default=list(BENCHMARKS), help='the benchmarks to run')
+    parser.add_argument('-r', '--repeat', type=int, default=DEFAULT_REPEAT,
+                        help='the num of times every benchmark runs')
+    parser.add_argument('--duration', type=float, default=120,
+                        help='the length of the synthetic song in sec')
+    parser.add_argument('--phrase', type=float, default=8,
+                        help='the length of the repeating phrase of the song in sec')
+    parser.add_argument('-o', '--output', help='the json file that results are written into')
+    parser.add_argument('--baseline', default=BASELINE_PATH,
+                        help='the json file of the baseline results')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='the ratio that benchmarks may be slower than the baseline by')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='write the results as the new baseline')
+    return parser.parse_args(argv)
+
+def main(argv):
+    arguments = parse_arguments(argv)
+    pygame.init()
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        ANALYSIS_CACHE.folder = os.path.join(folder, 'cache')
+        filename = 'synthetic_%gs.wav' % arguments.duration
+        write_song(os.path.join(folder, filename), arguments.duration, arguments.phrase)
+        for name in arguments.benchmarks:
+            song = Song(filename, folder)
+            results[name] = measure(BENCHMARKS[name](song), arguments.repeat)
+            print('%-32s min %10.2f ms  median %10.2f ms'
+                  % (name, results[name]['min_ms'], results[name]['median_ms']))
+    pygame.quit()
+
+    report = {'machine': get_machine(),
+              'song': {'duration': arguments.duration, 'phrase': arguments.phrase},
+              'results': results}
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    baseline = None
+    if os.path.exists(arguments.baseline):
+        with open(arguments.baseline) as file:
+            baseline = json.load(file)
+        if baseline['machine'] != report['machine'] or baseline['song'] != report['song']:
+            reason = 'on another machine' if baseline['machine'] != report['machine'] \
+                     else 'on another song'
+            if not arguments.update_baseline:
+                print('The baseline is measured %s, results are not compared' % reason)
+                return 0
+            baseline = None
+
+    if arguments.update_baseline:
+        # benchmarks that did not run keep their baseline
+        if baseline:
+            report['results'] = dict(baseline['results'], **results)
+        with open(arguments.baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+        return 0
+
+    if baseline is None:
+        print('No baseline at %s, record one with --update-baseline' % arguments.baseline)
+        return 0
+    regressions = compare(results, baseline['results'], arguments.threshold)
+    for name, baseline_time, result_time in regressions:
+        print('REGRESSION %s: %.2f ms -> %.2f ms (+%.0f%%)'
+              % (name, baseline_time, result_time, (result_time / baseline_time - 1) * 100))
+    print('%d of %d benchmarks slower than the baseline by over %.0f%%'
+          % (len(regressions), len(results), arguments.threshold * 100))
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,84 @@
+"""Program Description
+
+The synthetic_audio.py program generates music files for benchmarks,
+so that they need no copyrighted music. A synthetic song is a click
+track over a sine sweep, made of a phrase that repeats with a little
+noise, thus it has beats, a spread spectrum and repeating patterns
+like a real song.
+"""
+
+import numpy as np
+import soundfile
+
+DEFAULT_SAMPLE_RATE = 22050
+# the duration in sec and the frequency in Hz of a click
+CLICK_DURATION = 0.01
+CLICK_FREQUENCY = 1000
+# the frequencies in Hz that a sweep goes from and to
+SWEEP_START = 50
+SWEEP_END = 6000
+
+def clicks(duration, bpm=120, sample_rate=DEFAULT_SAMPLE_RATE):
+    """Generate a click at every beat.
+
+    Arguments:
+        duration: The length in sec.
+        bpm: The num of beats per minute.
+        sample_rate: The num of samples per sec.
+    Returns:
+        An array of samples.
+    """
+
+    samples = np.zeros(int(duration * sample_rate), dtype=np.float32)
+    click_time = np.arange(int(CLICK_DURATION * sample_rate)) / sample_rate
+    click = np.sin(2 * np.pi * CLICK_FREQUENCY * click_time) * np.exp(-click_time * 400)
+    for start in np.arange(0, duration, 60 / bpm):
+        begin = int(start * sample_rate)
+        end = min(begin + click.shape[0], samples.shape[0])
+        samples[begin:end] += click[:end - begin]
+    return samples
+
+def sine_sweep(duration, start=SWEEP_START, end=SWEEP_END, sample_rate=DEFAULT_SAMPLE_RATE):
+    """Generate a sine that sweeps exponentially from one frequency to another.
+
+    Arguments:
+        duration: The length in sec.
+        start: The frequency in Hz at the beginning.
+        end: The frequency in Hz at the end.
+        sample_rate: The num of samples per sec.
+    Returns:
+        An array of samples.
+    """
+
+    time = np.arange(int(duration * sample_rate)) / sample_rate
+    rate = np.log(end / start) / duration
+    phase = 2 * np.pi * start * (np.exp(rate * time) - 1) / rate
+    return np.sin(phase).astype(np.float32)
+
+def repeated_phrases(duration, phrase_length=8, bpm=120, sample_rate=DEFAULT_SAMPLE_RATE, seed=0):
+    """Generate a song made of a phrase of clicks and a sweep that repeats.
+
+    Arguments:
+        duration: The length in sec.
+        phrase_length: The length in sec of the phrase.
+        bpm: The num of beats per minute of the clicks.
+        sample_rate: The num of samples per sec.
+        seed: The seed of the noise.
+    Returns:
+        An array of samples.
+    """
+
+    phrase = 0.6 * clicks(phrase_length, bpm, sample_rate) \
+             + 0.3 * sine_sweep(phrase_length, sample_rate=sample_rate)
+    repeats = int(np.ceil(duration / phrase_length))
+    samples = np.tile(phrase, repeats)[:int(duration * sample_rate)]
+    # the noise keeps repeats from being exactly the same
+    rng = np.random.default_rng(seed)
+    samples += 0.02 * rng.standard_normal(samples.shape[0]).astype(np.float32)
+    return samples
+
+def write_song(path, duration, phrase_length=8, bpm=120, sample_rate=DEFAULT_SAMPLE_RATE):
+    """Generate a song of repeated phrases and write it into a wav file."""
+    samples = repeated_phrases(duration, phrase_length, bpm, sample_rate)
+    soundfile.write(path, samples, sample_rate)
+    return path
@@ -0,0 +1,120 @@
+"""Program Description
+
+The compile_charts.py program compiles the charts of every music file
+in a folder for all key modes with a process pool, so that song packs
+can be shipped with their charts.
+
+Usage: python compile_charts.py [music_folder] [-o output_folder] [-j workers] [-k 4 6 8] [-f]
+"""
+
+import os
+import sys
+import time
+import argparse
+import traceback
+import multiprocessing
+from model.setting import MUSIC_FOLDER, CHART_FOLDER, Keyset
+from model.music import Song, get_patterned_beats
+from model.chart import Chart, compile_chart, get_chart_path
+
+# file extensions of music files
+MUSIC_EXTENSIONS = ('.mp3', '.wav', '.ogg', '.flac')
+# key modes by their num of keys
+MODES = {len(mode): mode for mode in (Keyset.FOUR_KEYS, Keyset.SIX_KEYS, Keyset.EIGHT_KEYS)}
+
+def find_music_files(music_folder):
+    """Find all music files in a folder and its subfolders.
+
+    Returns:
+        A sorted list of file names relative to the music folder.
+    """
+
+    music_files = []
+    for root, _, files in os.walk(music_folder):
+        for filename in files:
+            if filename.lower().endswith(MUSIC_EXTENSIONS):
+                music_files.append(os.path.relpath(os.path.join(root, filename), music_folder))
+    return sorted(music_files)
+
+def is_up_to_date(music_path, chart_paths):
+    """Check whether all charts are valid and newer than the music file."""
+    music_time = os.path.getmtime(music_path)
+    return all(Chart.is_valid(path) and os.path.getmtime(path) >= music_time
+               for path in chart_paths)
+
+def compile_song(task):
+    """Compile the charts of a music file, errors are returned rather than raised.
+
+    Arguments:
+        task: A tuple of the music folder, the file name and
+              a dict of chart paths by their num of keys.
+    Returns:
+        A tuple of the file name, the elapsed time and the error message if any.
+    """
+
+    music_folder, filename, chart_paths = task
+    start = time.perf_counter()
+    try:
+        song = Song(filename, music_folder)
+        beats, patterns = get_patterned_beats(song)
+        song.release()
+        for key_num, chart_path in chart_paths.items():
+            os.makedirs(os.path.dirname(chart_path), exist_ok=True)
+            compile_chart(beats, patterns, MODES[key_num]).save(chart_path)
+    except Exception:
+        return filename, time.perf_counter() - start, traceback.format_exc(limit=-3)
+    return filename, time.perf_counter() - start, None
+
+def parse_arguments(argv):
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(description='Compile the charts of music files.')
+    parser.add_argument('music_folder', nargs='?', default=MUSIC_FOLDER,
+                        help='the folder of music files')
+    parser.add_argument('-o', '--output', default=CHART_FOLDER,
+                        help='the folder that charts are written into')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help='the num of worker processes')
+    parser.add_argument('-k', '--keys', type=int, nargs='+', choices=sorted(MODES),
+                        default=sorted(MODES), help='the key modes to compile')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='compile charts that are already up to date')
+    return parser.parse_args(argv)
+
+def main(argv):
+    arguments = parse_arguments(argv)
+    music_files = find_music_files(arguments.music_folder)
+
+    tasks = []
+    for filename in music_files:
+        chart_paths = {key_num: get_chart_path(arguments.output, filename, key_num)
+                       for key_num in arguments.keys}
+        music_path = os.path.join(arguments.music_folder, filename)
+        if arguments.force or not is_up_to_date(music_path, chart_paths.values()):
+            tasks.append((arguments.music_folder, filename, chart_paths))
+    skipped = len(music_files) - len(tasks)
+    print('Found %d music files, %d up to date, %d to compile'
+          % (len(music_files), skipped, len(tasks)))
+    if not tasks:
+        return 0
+
+    failed = []
+    start = time.perf_counter()
+    workers = max(1, min(arguments.workers, len(tasks)))
+    with multiprocessing.get_context('spawn').Pool(workers) as pool:
+        results = pool.imap_unordered(compile_song, tasks)
+        for done, (filename, elapsed, error) in enumerate(results, 1):
+            status = 'failed' if error else 'ok'
+            print('[%d/%d] %s %s (%.1fs)' % (done, len(tasks), filename, status, elapsed))
+            if error:
+                failed.append((filename, error))
+    elapsed = time.perf_counter() - start
+
+    compiled = len(tasks) - len(failed)
+    print('Compiled %d songs, skipped %d, failed %d in %.1fs (%.1f songs per minute)'
+          % (compiled, skipped, len(failed), elapsed, compiled / elapsed * 60))
+    for filename, error in failed:
+        print('\n%s:\n%s' % (filename, error), file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
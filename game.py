@@ -6,15 +6,27 @@ and deals with key pressing event.
 """
 
 import pygame
+import os
 import sys
-from pygame import key, mixer
+from pygame import key
 from math import ceil
-from render import display_score, load_img, render_background, render_all_tracks, render_text_center
+from render import DIRTY_MAX_AREA_RATIO, DirtyRects, build_static_layer, display_score, load_img, \
+                   render_all_tracks, render_overlay, render_text_center
 from model.circles import CircleHandler
-from model.track import Track
-from model.score_circles import score_miss, score_press
-from model.setting import MUSIC_FOLDER, CAPTION, FRAME_RATE, DefaultSetting, Keyset
+from model.track import create_tracks
+from model.score_circles import get_press_time, score_miss, score_press
+from model.setting import MUSIC_FOLDER, CHART_FOLDER, CAPTION, FRAME_RATE, OVERLAY_ENV, \
+                          FRAME_STATS_ENV, PROFILE_ENV, DefaultSetting, Keyset
 from model.audio_visualizer import AudioVisualizer
+from model.clock import AudioClock
+from model.autoplay import Autoplay
+from model.input_poller import InputPoller
+from model.profiler import StageTimer, run_profiled
+from model.music import Song, get_patterned_beats
+from model.chart import compile_chart, get_chart_path, load_compiled_chart
+
+# num of frames between updates of the frame time overlay
+OVERLAY_INTERVAL = FRAME_RATE // 2
 
 """
 The code below set pygame adapt to resolutions over 2k on windows.
@@ -42,7 +54,11 @@ class Game():
         def __init__(self, music, background_source,
                      size=DefaultSetting.LARGE_SCREEN_SIZE,
                      mode=Keyset.SIX_KEYS,
-                     velocity=DefaultSetting.MEDIUM_VELOCITY):
+                     velocity=DefaultSetting.MEDIUM_VELOCITY,
+                     frame_rate=FRAME_RATE,
+                     autoplay=False,
+                     dirty_rects=True,
+                     input_offset=DefaultSetting.DEFAULT_INPUT_OFFSET):
             """GameParameters constructor.
 
             Arguments:
@@ -50,7 +66,12 @@ class Game():
                 background_source: The filename of the background image file.
                 size: The screen size.
                 mode: The game key set mode.
-                velocity: The velocity of the circles.
+                velocity: The velocity of the circles in px per sec.
+                frame_rate: The max num of frames per sec, 0 for no limit.
+                autoplay: Whether the keys are pressed by the game itself.
+                dirty_rects: Whether only the regions that change are redrawn,
+                             or else the whole screen every frame.
+                input_offset: The latency in ms of key presses against the music.
             """
 
             self.music = music
@@ -58,13 +79,26 @@ class Game():
             self.size = size
             self.mode = mode
             self.velocity = velocity
+            self.frame_rate = frame_rate
+            self.autoplay = autoplay
+            self.dirty_rects = dirty_rects
+            self.input_offset = input_offset
 
-    def __init__(self, parameters: GameParameters):
+    def __init__(self, parameters: GameParameters, song: Song = None,
+                 audio_clock=None, chart=None, keep_frames=False):
         """Game constructor.
 
         Arguments:
             parameters: The parameter of the game setting, wrapped as
                         a GameParameters instance.
+            song: The song of the music file, it will be created from
+                  the parameters if not given.
+            audio_clock: The clock that the game runs on, an AudioClock
+                         playing the music if not given.
+            chart: The chart to play, the compiled chart of the music
+                   if not given.
+            keep_frames: Whether the stage times of every frame are kept,
+                         which they also are if FRAME_STATS_ENV is set.
         """
 
         # read parameters
@@ -73,22 +107,42 @@ class Game():
         self.size = parameters.size
         self.mode = parameters.mode
         self.velocity = parameters.velocity
+        self.frame_rate = parameters.frame_rate
+        self.dirty_rects = parameters.dirty_rects
+        self.input_offset = parameters.input_offset
 
         self.score = 0
         self.key_num = len(self.mode)
         self.track_width = self.size[0] // (self.key_num+1)
         self.track_height = self.size[1]-ceil(0.5*self.track_width)
 
-        mixer.music.load(MUSIC_FOLDER + self.music)
-        self.clock = pygame.time.Clock()
+        self.audio_clock = audio_clock if audio_clock else AudioClock(MUSIC_FOLDER + self.music)
+        self.keep_frames = keep_frames or bool(os.environ.get(FRAME_STATS_ENV))
+        self.timer = StageTimer(self.keep_frames)
+        # the frame time overlay, toggled by F3
+        self.show_overlay = os.environ.get(OVERLAY_ENV) == '1'
+        self.overlay_lines = []
         
         self.__init_screen()
         self.__init_components()
         self.__init_tracks()
+        # the background and the keys that are not pressed do not change between frames
+        self.static_layer = build_static_layer(self.background, self.tracks, self.key_img)
 
-        self.time_delay = self.track_height / self.velocity / FRAME_RATE
-        self.circle_handler = CircleHandler(self.music, self.mode, self.time_delay)
-        self.visualizer = AudioVisualizer(self.size, self.music)
+        # the time in sec that circles take to reach the keys
+        self.time_delay = self.track_height / self.velocity
+        # all analyses share the samples of the song that are decoded once
+        self.song = song if song else Song(self.music)
+        # play the precompiled chart if there is one, or compile it from the analysis
+        if chart is None:
+            chart = load_compiled_chart(get_chart_path(CHART_FOLDER, self.music, self.key_num),
+                                        self.song.path)
+        if chart is None:
+            chart = compile_chart(*get_patterned_beats(self.song), self.mode)
+        self.circle_handler = CircleHandler(chart, self.time_delay)
+        self.autoplay = Autoplay(chart, self.mode, self.time_delay) if parameters.autoplay else None
+        self.visualizer = AudioVisualizer(self.size, self.song)
+        self.song.release()
 
 
     def __init_screen(self):
@@ -102,7 +156,7 @@ class Game():
         # background img
         self.background = load_img(self.background_source, self.size)
         # key img
-        self.key_img = load_img('key1.png', (self.track_width, self.track_width)).convert_alpha()
+        self.key_img = load_img('key1.png', (self.track_width, self.track_width), alpha=True)
         # lightened key img
         light = pygame.Surface((self.key_img.get_width(), self.key_img.get_height()),
                                 flags=pygame.SRCALPHA)
@@ -110,75 +164,124 @@ class Game():
         self.light_key_img = self.key_img.copy()
         self.light_key_img.blit(light, (0, 0), special_flags=pygame.BLEND_RGBA_ADD)
         # circle img
-        self.circle_img = load_img('circle.png', (self.track_width, self.track_width)).convert_alpha()
+        self.circle_img = load_img('circle.png', (self.track_width, self.track_width), alpha=True)
     
     def __init_tracks(self):
         """Initiate all tracks."""
-        self.tracks = {}
         # the keys of tracks match directly the mode
-        for track_index in range(1, self.key_num+1):
-            self.tracks[track_index] = Track(self.track_width, self.track_height,
-                                             (ceil(self.track_width*(track_index-0.5)), -self.track_width))
+        positions = [(ceil(self.track_width*(track_index-0.5)), -self.track_width)
+                     for track_index in range(1, self.key_num+1)]
+        self.tracks = create_tracks(self.track_width, self.track_height, positions)
 
     def mainloop(self):
-        """Run the main game loop."""
+        """Run the main game loop. The game is run under cProfile if
+        PROFILE_ENV is set, and the stage times are dumped at the end
+        if FRAME_STATS_ENV is set.
+        """
+
+        profile_path = os.environ.get(PROFILE_ENV)
+        if profile_path:
+            run_profiled(self.__play, profile_path)
+        else:
+            self.__play()
+        stats_path = os.environ.get(FRAME_STATS_ENV)
+        if stats_path:
+            self.timer.save(stats_path)
+
+    def __play(self):
+        """Play the game until the music ends or the window is closed."""
         # initiate all attributes
         in_game = True
         score = 0
         combo = 0
         # start playing the music
-        mixer.music.play()
+        self.audio_clock.start()
+        self.timer = StageTimer(self.keep_frames)
+        # key presses are read and stamped while waiting for the next frame
+        # and between the stages of a frame, however long rendering takes
+        input_poller = InputPoller(self.audio_clock, self.frame_rate)
+        def end_stage(name):
+            self.timer.stage(name)
+            input_poller.poll()
+        # redraw the whole screen every frame unless dirty rects are on
+        dirty_rects = DirtyRects(self.screen, self.static_layer,
+                                 DIRTY_MAX_AREA_RATIO if self.dirty_rects else 0)
 
         # start game loop
         while in_game:
             # set refresh rate
-            self.clock.tick(FRAME_RATE)
-            # render background, score
-            render_background(self.background, self.screen)
-            display_score(score, (0, 0), self.screen)
+            self.timer.start_frame()
+            input_poller.wait()
+            self.timer.stage('wait')
+            # everything in a frame is rendered at the same music time
+            time = self.audio_clock.now()
 
-            # handle events
-            for event in pygame.event.get():
+            # press the keys of arrived circles in autoplay
+            if self.autoplay:
+                self.autoplay.press(time)
+            # handle events right after they are read, before anything is rendered
+            for event in input_poller.get():
                 if event.type == pygame.QUIT:
                     in_game = False
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    self.show_overlay = not self.show_overlay
                 if event.type == pygame.KEYDOWN:
-                    # update status for key being pressed
-                    received_score = score_press(event, self.tracks,
-                                                 self.mode, FRAME_RATE, self.velocity)
+                    # judge the press by the exact time it happens at
+                    press_time = get_press_time(event, time, self.input_offset)
+                    received_score = score_press(event, self.tracks, self.mode, press_time)
                     if received_score != 0:
                         combo += 1
                         score += received_score
 
             # apply key pressing effects
-            key_imgs = get_key_imgs(self.key_img, self.light_key_img,
-                                    self.key_num, self.mode)
+            key_imgs = get_key_imgs(self.light_key_img, self.key_num, self.mode)
+            end_stage('events')
+
+            # erase the last frame, render score
+            dirty_rects.restore()
+            rects = [display_score(score, (0, 0), self.screen)]
+            end_stage('background')
 
             # generate and update circles to tracks
-            self.circle_handler.update_circles(self.velocity, self.tracks)
+            self.circle_handler.update_circles(time, self.velocity, self.tracks)
+            end_stage('circles')
             # render audio visualizer
-            self.visualizer.render(self.screen)
+            rects.append(self.visualizer.render(self.screen, time))
+            end_stage('visualizer')
             # display combo
-            render_text_center(str(combo), self.screen, style='center', color='white')
+            rects.append(render_text_center(str(combo), self.screen, style='center', color='white'))
             # render all tracks
-            render_all_tracks(self.tracks, key_imgs, self.circle_img, self.screen)
+            rects.extend(render_all_tracks(self.tracks, key_imgs, self.circle_img, self.screen))
+            end_stage('tracks')
             # score miss circles
-            received_score = score_miss(self.tracks, FRAME_RATE, self.velocity)
+            received_score = score_miss(self.tracks, time)
             if received_score < 0:
                 combo = 0
                 score += received_score
+            end_stage('judge')
+            # show the frame times, which are summarized twice a sec
+            if self.show_overlay:
+                if self.timer.frames % OVERLAY_INTERVAL == 1:
+                    self.overlay_lines = self.timer.get_overlay_lines()
+                rects.append(render_overlay(self.overlay_lines, (0, self.size[1] // 10), self.screen))
+                end_stage('overlay')
 
-            # rerender all components
-            pygame.display.update()
+            # rerender the regions that change
+            dirty_rects.update(rects)
+            end_stage('display')
             # stop the game if the music ends.
-            if not pygame.mixer.music.get_busy():
+            if not self.audio_clock.is_playing():
                 in_game = False
         
         self.score = score
 
 
-def get_key_imgs(key_img, light_key_img, key_num, mode):
-    """Lighten keys if they are pressed."""
-    key_imgs = [key_img] * key_num
+def get_key_imgs(light_key_img, key_num, mode):
+    """Lighten keys if they are pressed. Keys that are not pressed are
+    on the static layer, thus they have no image to be rendered.
+    """
+
+    key_imgs = [None] * key_num
     keys = key.get_pressed()
     for gamekey in mode:
         if keys[gamekey]:
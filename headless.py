@@ -0,0 +1,106 @@
+"""Program Description
+
+The headless.py program runs the game without a window or sound and
+lets an autoplay press the keys, so that a whole song is played as
+fast as frames can be rendered. It reports the simulated frame rate,
+the time of every stage of a frame and the final score, for the charts
+of a music file or for stress charts of extreme densities.
+
+Usage: python headless.py music_file [-k 4 6 8] [-s small medium large]
+                          [--stress 20 50 100] [--chord 1] [--full-redraw] [--duration 60]
+"""
+
+import os
+# use the dummy drivers before pygame is initiated
+os.environ['SDL_VIDEODRIVER'] = 'dummy'
+os.environ['SDL_AUDIODRIVER'] = 'dummy'
+
+import sys
+import time
+import argparse
+import pygame
+from game import Game
+from model.setting import FRAME_RATE, DefaultSetting
+from model.music import Song, get_music_length
+from model.clock import SimulatedClock
+from model.chart import generate_stress_chart
+from compile_charts import MODES
+
+# screen sizes by their names
+SCREEN_SIZES = {name.lower(): size for name, size in DefaultSetting.SCREEN_SIZES}
+BACKGROUND = 'background1.jpg'
+
+def run_game(song, key_num, size, duration, chart=None, dirty_rects=True):
+    """Play a game headless from the start to the end.
+
+    Arguments:
+        song: The song of the music file.
+        key_num: The num of keys of the game.
+        size: The screen size.
+        duration: The length of the game in sec.
+        chart: The chart to play, the compiled chart of the music if not given.
+        dirty_rects: Whether only the regions that change are redrawn.
+    Returns:
+        A tuple of the game, which holds the score and the stage timer,
+        and the elapsed time in sec.
+    """
+
+    parameters = Game.GameParameters(song.filename, BACKGROUND, size, MODES[key_num],
+                                     frame_rate=0, autoplay=True, dirty_rects=dirty_rects)
+    game = Game(parameters, song, SimulatedClock(duration, FRAME_RATE), chart, keep_frames=True)
+    start = time.perf_counter()
+    game.mainloop()
+    return game, time.perf_counter() - start
+
+def report(label, game, elapsed):
+    """Print the frame rate, the stage times and the score of a game."""
+    frame_time = elapsed * 1000 / game.timer.frames
+    budget = 'over' if frame_time > 1000 / FRAME_RATE else 'within'
+    print('%s: %d frames in %.1fs, %.0f fps, %.2f ms per frame (%s the %d fps budget), score %d'
+          % (label, game.timer.frames, elapsed, game.timer.frames / elapsed,
+             frame_time, budget, FRAME_RATE, game.score))
+    summary = game.timer.summary()
+    print('    p50 %.2f ms, p99 %.2f ms, work p99 %.2f ms, stages: '
+          % (summary['p50'], summary['p99'], summary['work_p99'])
+          + ', '.join('%s %.3f' % item for item in game.timer.means().items()))
+
+def parse_arguments(argv):
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(description='Run the game headless with an autoplay.')
+    parser.add_argument('music_file', help='the music file in the music folder')
+    parser.add_argument('-k', '--keys', type=int, nargs='+', choices=sorted(MODES),
+                        default=[6], help='the key modes to play')
+    parser.add_argument('-s', '--sizes', nargs='+', choices=list(SCREEN_SIZES),
+                        default=['large'], help='the screen sizes to play')
+    parser.add_argument('--stress', type=float, nargs='+', default=[],
+                        help='play stress charts of these num of beats per sec instead')
+    parser.add_argument('--chord', type=int, default=1,
+                        help='the num of circles of every beat of stress charts')
+    parser.add_argument('--full-redraw', action='store_true',
+                        help='redraw the whole screen every frame')
+    parser.add_argument('--duration', type=float,
+                        help='the length of games in sec, the whole music if not given')
+    return parser.parse_args(argv)
+
+def main(argv):
+    arguments = parse_arguments(argv)
+    pygame.init()
+    song = Song(arguments.music_file)
+    duration = arguments.duration or get_music_length(song)
+
+    for size_name in arguments.sizes:
+        for key_num in arguments.keys:
+            label = '%s %dk' % (size_name, key_num)
+            if not arguments.stress:
+                report(label, *run_game(song, key_num, SCREEN_SIZES[size_name], duration,
+                                        dirty_rects=not arguments.full_redraw))
+            for density in arguments.stress:
+                chart = generate_stress_chart(duration, key_num, density, arguments.chord)
+                report('%s stress %g/s' % (label, density),
+                       *run_game(song, key_num, SCREEN_SIZES[size_name], duration, chart,
+                                 not arguments.full_redraw))
+    pygame.quit()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
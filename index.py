@@ -12,7 +12,8 @@ import pygame_menu
 from game import Game
 from model.setting import DefaultSetting, MUSIC_FOLDER, IMAGE_FOLDER
 from model.utils import report_error
-from model.music import get_music_length
+from model.music import Song, get_music_length
+from model.preloader import AnalysisPreloader
 from render import render_background, render_text_center, load_img
 
 # global constants
@@ -20,28 +21,6 @@ DEFAULT_SIZE = DefaultSetting.LARGE_SCREEN_SIZE
 TEXT_DISPLAY_TIME = 2
 SELECTION_SIZE = 8
 
-# game initiation, reading music files
-files = os.listdir(MUSIC_FOLDER)
-music_files = []
-for filename in files:
-    if filename.endswith('.mp3'):
-        music_files.append(filename)
-
-# reading background img files
-files = os.listdir(IMAGE_FOLDER)
-background_images = []
-for filename in files:
-    if filename.startswith('background'):
-        background_images.append(filename)
-
-if len(music_files) < 1:
-    report_error('There is no valid music file in the music folder')
-if len(background_images) < 1:
-    report_error('Missing background image files')
-
-parameters = Game.GameParameters(music_files[0], background_images[0])
-screen = pygame.display.set_mode(DEFAULT_SIZE)
-
 def display_text(text, screen, size):
     """Display text and rerender the screen."""
     background = load_img('index.jpg', size)
@@ -52,6 +31,7 @@ def display_text(text, screen, size):
 # functions of widget to set parameters
 def set_music(_, selected_music):
     parameters.music = selected_music
+    preloader.prioritize(selected_music)
 
 def set_background(_, selected_background):
     parameters.background_source = selected_background
@@ -65,44 +45,84 @@ def set_velocity(_, selected_velocity):
 def set_mode(_, selected_mode):
     parameters.mode = selected_mode
 
+def set_input_offset(_, selected_input_offset):
+    parameters.input_offset = selected_input_offset
+
 def prepare_game():
-    """Initiate the game and return the length of music."""
-    music_length = get_music_length(parameters.music)
+    """Initiate the game and return the song of the music."""
+    display_text('Generating the game...', screen, DEFAULT_SIZE)
+    song = Song(parameters.music)
+    # the length is read from the header, thus it is checked before waiting for the analysis
+    music_length = get_music_length(song)
     # music should be longer than 30 secs at least
     if music_length < 30 or music_length > 1000:
+        preloader.close()
         report_error('The music is too long or too short')
-    display_text('Generating the game...', screen, DEFAULT_SIZE)
+    # use the background analysis, or wait for the rest of it
+    preloader.wait(parameters.music)
+    preloader.close()
+    return song
 
 def close_menu():
     """Close the menu."""
     menu.disable()
 
-# initiate the game
-pygame.init()
-# initiate menu
-menu = pygame_menu.Menu('Game Menu', DEFAULT_SIZE[0], DEFAULT_SIZE[1],
-                       theme=pygame_menu.themes.THEME_BLUE)
-# menu widgets
-menu.add.dropselect('Music :', list(zip(music_files, music_files)), onchange=set_music,
-                    default=0, selection_box_height=SELECTION_SIZE)
-menu.add.dropselect('Background :', list(zip(background_images, background_images)),
-                    onchange=set_background, default=0, selection_box_height=SELECTION_SIZE)
-menu.add.dropselect('Screen Size :', DefaultSetting.SCREEN_SIZES, onchange=set_size, default=2)
-menu.add.selector('Velocity: ', DefaultSetting.VELOCITIES, onchange=set_velocity, default=1)
-menu.add.selector('Mode: ', DefaultSetting.MODES, onchange=set_mode, default=1)
-menu.add.button('Start', close_menu)
-menu.add.button('Quit', pygame_menu.events.EXIT)
-
-# display menu
-menu.mainloop(screen)
-# loading screen
-prepare_game()
-# start game
-game = Game(parameters)
-game.mainloop()
-
-# display result
-display_text('Result Score is: %d, see ya!' % game.score, screen, game.size)
-time.sleep(TEXT_DISPLAY_TIME)
-# close window
-pygame.quit()
+# the analysis workers import this module as well, so the game
+# only starts when the program is run directly
+if __name__ == '__main__':
+    # game initiation, reading music files
+    files = os.listdir(MUSIC_FOLDER)
+    music_files = []
+    for filename in files:
+        if filename.endswith('.mp3'):
+            music_files.append(filename)
+
+    # reading background img files
+    files = os.listdir(IMAGE_FOLDER)
+    background_images = []
+    for filename in files:
+        if filename.startswith('background'):
+            background_images.append(filename)
+
+    if len(music_files) < 1:
+        report_error('There is no valid music file in the music folder')
+    if len(background_images) < 1:
+        report_error('Missing background image files')
+
+    parameters = Game.GameParameters(music_files[0], background_images[0])
+    screen = pygame.display.set_mode(DEFAULT_SIZE)
+    # analyze the music library in background while the menu is open
+    preloader = AnalysisPreloader(music_files)
+
+    # initiate the game
+    pygame.init()
+    # initiate menu
+    menu = pygame_menu.Menu('Game Menu', DEFAULT_SIZE[0], DEFAULT_SIZE[1],
+                           theme=pygame_menu.themes.THEME_BLUE)
+    # menu widgets
+    menu.add.dropselect('Music :', list(zip(music_files, music_files)), onchange=set_music,
+                        default=0, selection_box_height=SELECTION_SIZE)
+    menu.add.dropselect('Background :', list(zip(background_images, background_images)),
+                        onchange=set_background, default=0, selection_box_height=SELECTION_SIZE)
+    menu.add.dropselect('Screen Size :', DefaultSetting.SCREEN_SIZES, onchange=set_size, default=2)
+    menu.add.selector('Velocity: ', DefaultSetting.VELOCITIES, onchange=set_velocity, default=1)
+    menu.add.selector('Mode: ', DefaultSetting.MODES, onchange=set_mode, default=1)
+    menu.add.selector('Input Offset: ', DefaultSetting.INPUT_OFFSETS, onchange=set_input_offset,
+                      default=[offset for _, offset in DefaultSetting.INPUT_OFFSETS]
+                              .index(DefaultSetting.DEFAULT_INPUT_OFFSET))
+    menu.add.button('Start', close_menu)
+    menu.add.button('Quit', pygame_menu.events.EXIT)
+
+    # display menu
+    menu.mainloop(screen)
+    # loading screen
+    song = prepare_game()
+    # start game
+    game = Game(parameters, song)
+    game.mainloop()
+
+    # display result
+    display_text('Result Score is: %d, see ya!' % game.score, screen, game.size)
+    time.sleep(TEXT_DISPLAY_TIME)
+    # close window
+    pygame.quit()
@@ -0,0 +1,151 @@
+"""Program Description
+
+The assets.py program keeps the images of the game once they are
+decoded, scaled and converted into the pixel format of the screen,
+so that starting another game at the same screen size loads no image.
+Scaled images are also kept on disk as raw pixels, which are read far
+faster than a large image is decoded and scaled, thus every launch of
+the game after the first one skips decoding as well.
+"""
+
+import os
+import hashlib
+import pygame
+from collections import OrderedDict
+from model.cache import open_atomic
+from model.setting import IMAGE_FOLDER, ASSET_CACHE_FOLDER, ASSET_CACHE_SIZE, \
+    ASSET_DISK_CACHE_SIZE
+
+# the extension of raw pixel files on disk
+RAW_EXTENSION = '.raw'
+
+class AssetCache():
+    """The AssetCache class keeps images keyed by the file, the size and
+    whether they have per pixel alpha. The least recently used images
+    are evicted once their total size grows over the limit.
+    Images are shared, thus they must not be drawn on.
+    """
+
+    def __init__(self, folder=IMAGE_FOLDER, size_limit=ASSET_CACHE_SIZE, disk_folder=ASSET_CACHE_FOLDER,
+                 disk_size_limit=ASSET_DISK_CACHE_SIZE):
+        """AssetCache constructor.
+
+        Arguments:
+            folder: The folder of image files.
+            size_limit: The max total size of the images kept in memory in bytes.
+            disk_folder: The folder of scaled images kept on disk, None to
+                         keep images in memory only.
+            disk_size_limit: The max total size of the images kept on disk in bytes.
+        """
+
+        self.folder = folder
+        self.size_limit = size_limit
+        self.disk_folder = disk_folder
+        self.disk_size_limit = disk_size_limit
+        self.images = OrderedDict()
+        self.total_size = 0
+        # num of image files decoded, which a cached image never adds to
+        self.decoded = 0
+
+    def get_disk_entry(self, filename, size, alpha):
+        """Get the path of the raw pixels of a scaled image on disk. The path
+        changes with the content of the image file, since the size and the
+        modified time of the file are part of it.
+        """
+
+        stat = os.stat(os.path.join(self.folder, filename))
+        signature = '%s:%d:%d' % (filename, stat.st_size, stat.st_mtime_ns)
+        key = hashlib.sha1(signature.encode()).hexdigest()[:20]
+        return os.path.join(self.disk_folder, '%s-%dx%d-%s%s' % (key, size[0], size[1],
+                                                                 'rgba' if alpha else 'rgb',
+                                                                 RAW_EXTENSION))
+
+    def load_disk(self, filename, size, alpha):
+        """Load the raw pixels of a scaled image from disk.
+
+        Returns:
+            The image, or None if it is not on disk.
+        """
+
+        raw_format = 'RGBA' if alpha else 'RGB'
+        entry = self.get_disk_entry(filename, size, alpha)
+        try:
+            with open(entry, 'rb') as file:
+                pixels = file.read()
+            # mark the entry as recently used
+            os.utime(entry)
+        except OSError:
+            return None
+        if len(pixels) != size[0] * size[1] * len(raw_format):
+            return None
+        return pygame.image.frombytes(pixels, size, raw_format)
+
+    def save_disk(self, filename, image, alpha):
+        """Save the raw pixels of a scaled image to disk."""
+        entry = self.get_disk_entry(filename, image.get_size(), alpha)
+        os.makedirs(self.disk_folder, exist_ok=True)
+        with open_atomic(entry) as file:
+            file.write(pygame.image.tobytes(image, 'RGBA' if alpha else 'RGB'))
+        self.evict_disk()
+
+    def evict_disk(self):
+        """Remove the least recently used images on disk until they fit the size limit."""
+        entries = []
+        total_size = 0
+        for filename in os.listdir(self.disk_folder):
+            if not filename.endswith(RAW_EXTENSION):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.disk_folder, filename))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, filename))
+            total_size += stat.st_size
+
+        entries.sort()
+        for _, size, filename in entries:
+            if total_size <= self.disk_size_limit:
+                break
+            try:
+                os.remove(os.path.join(self.disk_folder, filename))
+            except OSError:
+                pass
+            total_size -= size
+
+    def load(self, filename, size=None, alpha=False):
+        """Load an image, from memory or disk if it has been loaded.
+
+        Arguments:
+            filename: The name of the file in the image folder.
+            size: The size of the image, none for original size.
+            alpha: Whether the image keeps per pixel alpha.
+        Returns:
+            The image, in the pixel format of the screen if there is one.
+        """
+
+        key = (filename, tuple(size) if size else None, alpha)
+        image = self.images.get(key)
+        if image is not None:
+            self.images.move_to_end(key)
+            return image
+
+        image = self.load_disk(filename, size, alpha) if self.disk_folder and size else None
+        if image is None:
+            image = pygame.image.load(os.path.join(self.folder, filename))
+            self.decoded += 1
+            if size and image.get_size() != tuple(size):
+                image = pygame.transform.scale(image, size)
+                if self.disk_folder:
+                    self.save_disk(filename, image, alpha)
+        # images can only be converted once the screen is set
+        if pygame.display.get_surface() is not None:
+            image = image.convert_alpha() if alpha else image.convert()
+
+        self.images[key] = image
+        self.total_size += image.get_width() * image.get_height() * image.get_bytesize()
+        while self.total_size > self.size_limit and len(self.images) > 1:
+            _, evicted = self.images.popitem(last=False)
+            self.total_size -= evicted.get_width() * evicted.get_height() * evicted.get_bytesize()
+        return image
+
+ASSET_CACHE = AssetCache()
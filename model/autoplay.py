@@ -0,0 +1,48 @@
+"""Program Description
+
+The autoplay.py program holds an Autoplay class that plays a chart by
+itself, so that a game can be run without anyone pressing the keys.
+"""
+
+import numpy as np
+import pygame
+from model.chart import TRACK_INDEXES
+
+class Autoplay():
+    """The Autoplay class presses the keys of circles once they arrive,
+    by posting key events that the game handles like real ones.
+    Events are stamped with the time that circles arrive, thus every
+    press is exactly on time whatever the frame rate is. They are also
+    marked as autoplay, so that no input offset is applied to them.
+    """
+
+    def __init__(self, chart, mode, time_delay=0):
+        """Autoplay constructor.
+
+        Arguments:
+            chart: The chart of the game.
+            mode: The game key set mode.
+            time_delay: The time in sec that circles take to reach the keys,
+                        the beats before it are skipped as the game does.
+        """
+
+        self.times = chart.times
+        self.masks = chart.masks
+        # the key of every track
+        self.keys = {track_index: gamekey for gamekey, track_index in mode.items()}
+        self.cursor = int(np.searchsorted(self.times, time_delay * 1000, side='right'))
+
+    def press(self, time):
+        """Press the keys of all circles that have arrived by the given time.
+
+        Arguments:
+            time: The time in ms since the music started.
+        """
+
+        end = int(np.searchsorted(self.times, time, side='right'))
+        for arrival_time, mask in zip(self.times[self.cursor:end].tolist(),
+                                      self.masks[self.cursor:end].tolist()):
+            for track_index in TRACK_INDEXES[mask]:
+                pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=self.keys[track_index],
+                                                     time=arrival_time, autoplay=True))
+        self.cursor = max(self.cursor, end)
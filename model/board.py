@@ -0,0 +1,120 @@
+"""Program Description
+
+The board.py program holds a Board class that keeps the circles
+of all tracks of a game together, so that every track is updated
+and checked for missed circles at once.
+"""
+
+import numpy as np
+
+# default value to represent a null circle, which never arrives
+DEFAULT_CIRCLE = np.inf
+# num of circles that a lane can hold before the board grows
+INITIAL_CIRCLE_NUM = 16
+
+class Board():
+    """The Board class keeps the time that circles arrive at the keys
+    as a struct of arrays, one row of a ring buffer for every lane.
+    Circles of a lane are kept in the order they arrive, and slots
+    without a circle hold DEFAULT_CIRCLE.
+    """
+
+    def __init__(self, lane_num, capacity=INITIAL_CIRCLE_NUM):
+        """Board constructor.
+
+        Arguments:
+            lane_num: The num of lanes, one for every track.
+            capacity: The num of circles that a lane can hold before the board grows.
+        """
+
+        # the time in ms that circles arrive at the key
+        self.circles = np.full((lane_num, capacity), DEFAULT_CIRCLE)
+        # the slot of the front circle and the num of circles of every lane
+        self.fronts = np.zeros(lane_num, dtype=np.intp)
+        self.counts = np.zeros(lane_num, dtype=np.intp)
+        self.lanes = np.arange(lane_num)
+        # the time in ms and the velocity in px per sec that positions are based on
+        self.time = 0
+        self.velocity = 0
+
+    def advance(self, time, velocity):
+        """Move all circles to where they are at the given time.
+
+        Arguments:
+            time: The time in ms since the music started.
+            velocity: The velocity of circles in px per sec.
+        """
+
+        self.time = time
+        self.velocity = velocity
+
+    def grow(self):
+        """Double the capacity and move the circles to the start of lanes."""
+        capacity = self.circles.shape[1]
+        slots = (self.fronts[:, None] + np.arange(capacity)) % capacity
+        circles = np.take_along_axis(self.circles, slots, axis=1)
+        self.circles = np.concatenate([circles, np.full_like(circles, DEFAULT_CIRCLE)], axis=1)
+        self.fronts[:] = 0
+
+    def add(self, lane, arrival_time):
+        """Add a circle to a lane. Circles must be added in the order
+        they arrive at the key.
+
+        Arguments:
+            lane: The lane of the circle.
+            arrival_time: The time in ms that the circle arrives at the key.
+        """
+
+        if self.counts[lane] == self.circles.shape[1]:
+            self.grow()
+        slot = (self.fronts[lane] + self.counts[lane]) % self.circles.shape[1]
+        self.circles[lane, slot] = arrival_time
+        self.counts[lane] += 1
+
+    def pop(self, lane):
+        """Remove the front circle of a lane."""
+        if self.counts[lane]:
+            self.circles[lane, self.fronts[lane]] = DEFAULT_CIRCLE
+            self.fronts[lane] = (self.fronts[lane] + 1) % self.circles.shape[1]
+            self.counts[lane] -= 1
+
+    def front(self):
+        """Get the front circles of all lanes.
+
+        Returns:
+            An array of the time in ms that the front circle of every lane
+            arrives at the key, DEFAULT_CIRCLE for lanes without circles.
+        """
+
+        return self.circles[self.lanes, self.fronts]
+
+    def expire(self, limit):
+        """Remove all circles that arrive before the limit. They are always
+        at the front since lanes are in the order circles arrive.
+
+        Arguments:
+            limit: The time in ms before which circles are removed.
+        Returns:
+            An array of the num of circles removed from every lane.
+        """
+
+        expired = self.circles < limit
+        expired_counts = np.count_nonzero(expired, axis=1)
+        if expired_counts.any():
+            self.circles[expired] = DEFAULT_CIRCLE
+            self.fronts = (self.fronts + expired_counts) % self.circles.shape[1]
+            self.counts -= expired_counts
+        return expired_counts
+
+    def get_arrival_times(self, lane):
+        """Get the time in ms that circles of a lane arrive at the key in order."""
+        capacity = self.circles.shape[1]
+        end = self.fronts[lane] + self.counts[lane]
+        if end <= capacity:
+            return self.circles[lane, self.fronts[lane]:end]
+        return np.concatenate([self.circles[lane, self.fronts[lane]:],
+                               self.circles[lane, :end - capacity]])
+
+def get_boards(track_dict):
+    """Get the boards that tracks are on, each of them once."""
+    return list({id(track.board): track.board for track in track_dict.values()}.values())
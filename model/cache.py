@@ -0,0 +1,197 @@
+"""Program Description
+
+The cache.py program keeps the analysis results of music files on disk,
+so that a song only needs to be analyzed once. Entries are keyed by the
+content of the music file and the parameters of the analysis, thus they
+are invalidated automatically once either of them changes.
+"""
+
+import os
+import time
+import json
+import hashlib
+import zipfile
+import numpy as np
+from contextlib import contextmanager
+from model.setting import CACHE_FOLDER, CACHE_SIZE
+
+# bump it to invalidate all entries written by an older analysis
+CACHE_VERSION = 1
+# the size of chunks being read when hashing a file
+HASH_CHUNK_SIZE = 1 << 20
+# the extension of cache entries, and of entries being written
+ENTRY_EXTENSION = '.npz'
+TEMP_EXTENSION = '.tmp'
+# the age in sec that entries being written are left behind by a killed writer after
+STALE_TEMP_AGE = 10 * 60
+
+@contextmanager
+def open_atomic(path):
+    """Open a file to be written. It is written into a temporary file
+    first, which replaces the file once it is complete, so that no one
+    reads a partial file.
+
+    Arguments:
+        path: The path of the file.
+    Returns:
+        A context manager of the temporary file opened in binary mode.
+    """
+
+    temp_path = '%s.%d%s' % (path, os.getpid(), TEMP_EXTENSION)
+    try:
+        with open(temp_path, 'wb') as file:
+            yield file
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+class AnalysisCache():
+    """The AnalysisCache class stores analysis results as numpy archives.
+    The least recently used entries are evicted once the cache grows
+    over its size limit.
+    """
+
+    def __init__(self, folder=CACHE_FOLDER, size_limit=CACHE_SIZE):
+        """AnalysisCache constructor.
+
+        Arguments:
+            folder: The folder that holds the cache entries.
+            size_limit: The max total size of the entries in bytes.
+        """
+
+        self.folder = folder
+        self.size_limit = size_limit
+        # file hashes memorized by the size and the modified time of files
+        self.__hashes = {}
+
+    def get_file_hash(self, path):
+        """Get the hash of the content of a file."""
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        memorized = self.__hashes.get(path)
+        if memorized and memorized[0] == signature:
+            return memorized[1]
+
+        sha = hashlib.sha1()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+                sha.update(chunk)
+        file_hash = sha.hexdigest()
+        self.__hashes[path] = (signature, file_hash)
+        return file_hash
+
+    def get_entry(self, path, section, parameters):
+        """Get the path of the cache entry.
+
+        Arguments:
+            path: The path of the music file.
+            section: The name of the analysis.
+            parameters: A dict of the parameters of the analysis.
+        Returns:
+            The path of the entry in the cache folder.
+        """
+
+        parameters = json.dumps([CACHE_VERSION, section, parameters], sort_keys=True)
+        parameters_hash = hashlib.sha1(parameters.encode()).hexdigest()
+        key = '%s-%s-%s' % (section, self.get_file_hash(path)[:20], parameters_hash[:12])
+        return os.path.join(self.folder, key + ENTRY_EXTENSION)
+
+    def load(self, path, section, parameters):
+        """Load an analysis result.
+
+        Returns:
+            A dict of arrays, or None if there is no valid entry.
+        """
+
+        entry = self.get_entry(path, section, parameters)
+        try:
+            with np.load(entry) as data:
+                result = {name: data[name] for name in data.files}
+        except (OSError, ValueError, EOFError, zipfile.BadZipFile):
+            return None
+        # mark the entry as recently used
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return result
+
+    def save(self, path, section, parameters, result):
+        """Save an analysis result.
+
+        Arguments:
+            path: The path of the music file.
+            section: The name of the analysis.
+            parameters: A dict of the parameters of the analysis.
+            result: A dict of arrays to be saved.
+        """
+
+        if self.size_limit <= 0:
+            return
+        entry = self.get_entry(path, section, parameters)
+        os.makedirs(self.folder, exist_ok=True)
+        with open_atomic(entry) as file:
+            np.savez(file, **result)
+        self.evict()
+
+    def fetch(self, path, section, parameters, analyze):
+        """Load an analysis result, or run the analysis and save it if missing.
+
+        Arguments:
+            path: The path of the music file.
+            section: The name of the analysis.
+            parameters: A dict of the parameters of the analysis.
+            analyze: A function that returns the result as a dict of arrays.
+        Returns:
+            A dict of arrays.
+        """
+
+        result = self.load(path, section, parameters)
+        if result is None:
+            result = analyze()
+            self.save(path, section, parameters, result)
+        return result
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits its size limit.
+        Entries being written are removed once they are stale, since their writer
+        has been killed.
+        """
+
+        entries = []
+        total_size = 0
+        stale_time = time.time() - STALE_TEMP_AGE
+        for filename in os.listdir(self.folder):
+            is_temp = filename.endswith(TEMP_EXTENSION)
+            if not filename.endswith(ENTRY_EXTENSION) and not is_temp:
+                continue
+            try:
+                stat = os.stat(os.path.join(self.folder, filename))
+            except OSError:
+                continue
+            if is_temp:
+                if stat.st_mtime < stale_time:
+                    try:
+                        os.remove(os.path.join(self.folder, filename))
+                    except OSError:
+                        pass
+                continue
+            entries.append((stat.st_mtime, stat.st_size, filename))
+            total_size += stat.st_size
+
+        entries.sort()
+        for _, size, filename in entries:
+            if total_size <= self.size_limit:
+                break
+            try:
+                os.remove(os.path.join(self.folder, filename))
+            except OSError:
+                pass
+            total_size -= size
+
+# the cache shared by all analyses
+ANALYSIS_CACHE = AnalysisCache()
@@ -0,0 +1,176 @@
+"""Program Description
+
+The chart.py program compiles the beats and patterns of a music into
+a chart, which tells the time that circles arrive at the keys and the
+tracks they are in. Charts can be saved into compact binary files that
+are memory mapped when a game starts.
+
+A chart file is laid out in little endian as
+    header: magic b'MGCH', uint16 version, uint16 key_num, uint32 beat_num
+    times:  int32[beat_num], the time in ms that beats occur
+    masks:  uint8[beat_num], the bitmask of tracks of each beat
+"""
+
+import os
+import mmap
+import struct
+import numpy as np
+from model.pattern_library import PatternLibrary
+from model.cache import open_atomic
+
+CHART_MAGIC = b'MGCH'
+CHART_VERSION = 1
+CHART_HEADER = struct.Struct('<4sHHI')
+CHART_EXTENSION = '.chart'
+TIME_TYPE = np.dtype('<i4')
+MASK_TYPE = np.dtype('u1')
+
+class Chart():
+    """The Chart class holds the circles of a game as arrays.
+    Tracks of a beat are stored as a bitmask where bit k-1 stands for track k.
+    """
+
+    def __init__(self, times, masks, key_num):
+        """Chart constructor.
+
+        Arguments:
+            times: An array of time in ms that beats occur.
+            masks: An array of the bitmask of tracks of each beat.
+            key_num: The number of keys in the keyset.
+        """
+
+        self.times = np.asarray(times, dtype=TIME_TYPE)
+        self.masks = np.asarray(masks, dtype=MASK_TYPE)
+        self.key_num = key_num
+
+    def save(self, path):
+        """Save the chart to a file."""
+        header = CHART_HEADER.pack(CHART_MAGIC, CHART_VERSION, self.key_num, self.times.shape[0])
+        with open_atomic(path) as file:
+            file.write(header)
+            file.write(self.times.tobytes())
+            file.write(self.masks.tobytes())
+
+    @staticmethod
+    def load(path):
+        """Load a chart from a file. The arrays are memory mapped
+        rather than read, so that loading takes no time.
+
+        Raises:
+            ValueError: If the file is not a valid chart.
+        """
+
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if size < CHART_HEADER.size:
+                raise ValueError('Not a chart file: %s' % path)
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, key_num, beat_num = CHART_HEADER.unpack_from(buffer)
+        if magic != CHART_MAGIC or version != CHART_VERSION:
+            raise ValueError('Unsupported chart file: %s' % path)
+        if size != CHART_HEADER.size + beat_num * (TIME_TYPE.itemsize + MASK_TYPE.itemsize):
+            raise ValueError('Truncated chart file: %s' % path)
+
+        times = np.frombuffer(buffer, TIME_TYPE, beat_num, CHART_HEADER.size)
+        masks = np.frombuffer(buffer, MASK_TYPE, beat_num, CHART_HEADER.size + times.nbytes)
+        return Chart(times, masks, key_num)
+
+    @staticmethod
+    def is_valid(path):
+        """Check whether a file is a chart of the current version."""
+        try:
+            with open(path, 'rb') as file:
+                magic, version, _, _ = CHART_HEADER.unpack(file.read(CHART_HEADER.size))
+        except (OSError, struct.error):
+            return False
+        return magic == CHART_MAGIC and version == CHART_VERSION
+
+def get_chart_path(chart_folder, filename, key_num):
+    """Get the path of the chart of a music file in the given key mode."""
+    return os.path.join(chart_folder, '%s.%dk%s' % (os.path.splitext(filename)[0],
+                                                   key_num, CHART_EXTENSION))
+
+def load_compiled_chart(chart_path, music_path):
+    """Load a compiled chart if it is newer than the music file.
+
+    Returns:
+        The chart, or None if there is no valid chart.
+    """
+
+    try:
+        if os.path.getmtime(chart_path) < os.path.getmtime(music_path):
+            return None
+        return Chart.load(chart_path)
+    except (OSError, ValueError):
+        return None
+
+def get_mask(track_indexes):
+    """Convert track indexes into a bitmask."""
+    mask = 0
+    for track_index in track_indexes:
+        mask |= 1 << (track_index - 1)
+    return mask
+
+def get_track_indexes(mask):
+    """Convert a bitmask into track indexes."""
+    return [bit + 1 for bit in range(mask.bit_length()) if mask >> bit & 1]
+
+# track indexes of all possible bitmasks
+TRACK_INDEXES = [tuple(get_track_indexes(mask)) for mask in range(1 << (8 * MASK_TYPE.itemsize))]
+
+def compile_chart(beats, patterns, mode):
+    """Compile the beats and patterns of a music into a chart.
+    Tracks are resolved for all beats at once the same way as
+    PatternLibrary.get_track_index does beat by beat: the beats in
+    a run of the same pattern go through its sequence from the
+    initial position of the sequence.
+
+    Arguments:
+        beats: An array of time in ms that beats occur.
+        patterns: An array of patterns corresponding to beats.
+        mode: The keyset mode.
+    Returns:
+        The compiled chart.
+    """
+
+    patterns = np.asarray(patterns, dtype=int)
+    pattern_library = PatternLibrary(int(patterns.max(initial=0)), mode)
+    sequences = pattern_library.sequences
+    # the masks of all sequences one after another
+    sequence_masks = np.array([get_mask(circles) for sequence in sequences
+                               for circles in sequence.sequence], dtype=MASK_TYPE)
+    lengths = np.array([sequence.length for sequence in sequences])
+    offsets = np.cumsum(lengths) - lengths
+    initials = np.array([sequence.initial for sequence in sequences])
+
+    # the position of every beat in the run of its pattern
+    index = np.arange(patterns.shape[0])
+    run_starts = np.ones(patterns.shape[0], dtype=bool)
+    run_starts[1:] = patterns[1:] != patterns[:-1]
+    steps = index - np.maximum.accumulate(np.where(run_starts, index, 0))
+
+    elements = offsets[patterns] + (initials[patterns] + steps) % lengths[patterns]
+    return Chart(np.round(beats), sequence_masks[elements], len(mode))
+
+def generate_stress_chart(duration, key_num, density, chord_size=1, seed=0):
+    """Generate a chart of evenly spaced beats on random tracks, which
+    can be far denser than any music, to stress the game in benchmarks.
+
+    Arguments:
+        duration: The length of the chart in sec.
+        key_num: The number of keys in the keyset.
+        density: The num of beats per sec.
+        chord_size: The num of circles of every beat.
+        seed: The seed of the random tracks.
+    Returns:
+        The generated chart.
+    """
+
+    rng = np.random.default_rng(seed)
+    beat_num = int(duration * density)
+    times = np.arange(beat_num) * 1000 / density
+    # pick different tracks for the circles of a beat
+    tracks = np.argsort(rng.random((beat_num, key_num)), axis=1)[:, :min(chord_size, key_num)]
+    masks = np.bitwise_or.reduce(1 << tracks, axis=1)
+    return Chart(np.round(times), masks, key_num)
@@ -4,46 +4,63 @@ The circle.py program will be initiated once the music is selected,
 it will then create a timeline for generating circles into tracks.
 """
 
-from pygame import mixer
-from model.pattern_library import PatternLibrary
-from model.music import get_patterned_beats
+import numpy as np
+from model.chart import Chart, TRACK_INDEXES
+from model.board import get_boards
 
 class CircleHandler():
-    """The CircleHandler class is responsible for generating circles."""
+    """The CircleHandler class is responsible for generating circles.
+    It plays a compiled chart with a cursor at the next beat to spawn.
+    """
 
-    def __init__(self, filename, mode, time_delay=0):
+    def __init__(self, chart: Chart, time_delay=0):
         """Class constructor of CircleHandler.
 
         Arguments:
-            filename: The name of music file.
-            mode: The keyset mode.
+            chart: The compiled chart of the music.
+            time_delay: The time in sec that circles take to reach the keys.
         """
 
-        self.beats, self.patterns = get_patterned_beats(filename)
-        self.pattern_library = PatternLibrary(max(self.patterns), mode)
+        self.chart = chart
         self.time_delay = time_delay
+        self.times = chart.times
+        # skip the beats in the starting part
+        self.seek(time_delay * 1000)
 
-    def update_circles(self, velocity, track_dict):
+    def seek(self, time):
+        """Place the cursor at the first beat that arrives after the given
+        time, so that the game can start or resume from there.
+
+        Arguments:
+            time: The time in ms since the music started.
+        """
+
+        self.cursor = int(np.searchsorted(self.times, time, side='right'))
+
+    def update_circles(self, time, velocity, track_dict):
         """Update circles in tracks.
 
         Arguments:
-            velocity: The velocity of circles will be incremented.
+            time: The time in ms since the music started.
+            velocity: The velocity of circles in px per sec.
             track_dict: A dict with values being tracks.
         """
 
-        self.generate_circles(track_dict)
-        for track in track_dict.values():
-            CircleHandler.increment_circles(velocity, track)
-
-    @staticmethod
-    def increment_circles(velocity, track):
-        """Increment circle positions in each track."""
-        track.update_circles(velocity)
-
-    def generate_circles(self, track_dict):
-        """Generate circles to tracks if beats occur."""
-        if self.beats and mixer.music.get_pos() + self.time_delay * 1000 > self.beats[0]:
-            self.beats.pop(0)
-            self.pattern = self.patterns.pop(0)
-            for track_index in self.pattern_library.get_track_index(self.pattern):
-                track_dict[track_index].add_circle()
+        self.generate_circles(time, track_dict)
+        # tracks on the same board are moved together
+        for board in get_boards(track_dict):
+            board.advance(time, velocity)
+
+    def generate_circles(self, time, track_dict):
+        """Generate circles of all beats that should have spawned by the given
+        time, thus beats do not fall behind after a lag. A circle that spawns
+        late starts the lower in its track the later it is, since positions
+        come from the time that circles arrive at the keys.
+        """
+
+        end = int(np.searchsorted(self.times, time + self.time_delay * 1000, side='left'))
+        for arrival_time, mask in zip(self.times[self.cursor:end].tolist(),
+                                      self.chart.masks[self.cursor:end].tolist()):
+            for track_index in TRACK_INDEXES[mask]:
+                track_dict[track_index].add_circle(arrival_time)
+        self.cursor = max(self.cursor, end)
@@ -0,0 +1,103 @@
+"""Program Description
+
+The clock.py program holds the clock of a game, which tells how
+long the music has been playing. Circles are placed and judged by
+this time, so that the game does not depend on the frame rate.
+"""
+
+import time
+from pygame import mixer
+
+# max difference in ms from the music position before the clock jumps to it
+RESYNC_THRESHOLD = 100
+# the ratio of the difference that the clock is slewed by on every reading
+SLEW_RATE = 0.05
+
+class AudioClock():
+    """The AudioClock class follows the playback of the music.
+    The music position only advances once an audio buffer is played,
+    so the clock runs on the performance counter and is slewed towards
+    the music position rather than jumping to it.
+    """
+
+    def __init__(self, path):
+        """AudioClock constructor.
+
+        Arguments:
+            path: The path of the music file.
+        """
+
+        mixer.music.load(path)
+        self.start_time = None
+        self.last_time = 0
+
+    def start(self):
+        """Start playing the music."""
+        mixer.music.play()
+        self.start_time = time.perf_counter()
+        self.last_time = 0
+
+    def now(self):
+        """Get the time since the music started.
+
+        Returns:
+            The time in ms, which never goes backwards.
+        """
+
+        if self.start_time is None:
+            return 0
+        elapsed = (time.perf_counter() - self.start_time) * 1000
+        position = mixer.music.get_pos()
+        # the position is -1 once the music stops
+        if position >= 0:
+            error = position - elapsed
+            if abs(error) > RESYNC_THRESHOLD:
+                correction = error
+            else:
+                correction = error * SLEW_RATE
+            self.start_time -= correction / 1000
+            elapsed += correction
+        self.last_time = max(self.last_time, elapsed)
+        return self.last_time
+
+    def is_playing(self):
+        """Check whether the music is still playing."""
+        return mixer.music.get_busy()
+
+class SimulatedClock():
+    """The SimulatedClock class stands for the AudioClock when no music
+    is played, e.g. in headless runs. The game reads the clock once
+    every frame, so the time advances by a frame on every reading and
+    a song is played as fast as frames are rendered.
+    """
+
+    def __init__(self, duration, frame_rate):
+        """SimulatedClock constructor.
+
+        Arguments:
+            duration: The length of the music in sec.
+            frame_rate: The num of frames per sec of the simulated time.
+        """
+
+        self.duration = duration * 1000
+        self.frame_time = 1000 / frame_rate
+        self.time = 0
+
+    def start(self):
+        """Start the simulated music from the beginning."""
+        self.time = 0
+
+    def now(self):
+        """Get the time of the current frame and move on to the next one.
+
+        Returns:
+            The time in ms.
+        """
+
+        time = self.time
+        self.time += self.frame_time
+        return time
+
+    def is_playing(self):
+        """Check whether the simulated music is still playing."""
+        return self.time < self.duration
@@ -0,0 +1,67 @@
+"""Program Description
+
+The input_poller.py program reads the key presses of a game while it
+waits for the next frame, so that presses are stamped within about a
+millisecond of happening rather than once every frame.
+"""
+
+import time
+from collections import deque
+import pygame
+
+# the interval in sec between two polls while waiting for the next frame
+POLL_INTERVAL = 0.001
+
+class InputPoller():
+    """The InputPoller class polls events at a fixed rate until the next
+    frame is due, stamps key presses with the music time they are read
+    at and queues events for the game loop to take.
+    SDL only pumps events on the thread that set the video mode, thus
+    polling happens in the wait for the next frame and between the
+    stages of a frame rather than in a thread of its own.
+    """
+
+    def __init__(self, audio_clock, frame_rate):
+        """InputPoller constructor.
+
+        Arguments:
+            audio_clock: The clock that presses are stamped by.
+            frame_rate: The max num of frames per sec, 0 for no limit.
+        """
+
+        self.audio_clock = audio_clock
+        self.frame_time = 1 / frame_rate if frame_rate else 0
+        self.next_frame = time.perf_counter()
+        self.events = deque()
+
+    def poll(self):
+        """Read the pending events. Key presses that are not stamped yet
+        are stamped with the time they are read at.
+        """
+
+        press_time = None
+        for event in pygame.event.get():
+            if event.type == pygame.KEYDOWN and not hasattr(event, 'time'):
+                # the clock is only read once there is a press to stamp
+                if press_time is None:
+                    press_time = self.audio_clock.now()
+                event.time = press_time
+            self.events.append(event)
+
+    def wait(self):
+        """Poll events until the next frame is due."""
+        self.poll()
+        now = time.perf_counter()
+        while now < self.next_frame:
+            time.sleep(min(POLL_INTERVAL, self.next_frame - now))
+            self.poll()
+            now = time.perf_counter()
+        # a late frame starts the schedule over rather than rushing the next ones
+        self.next_frame = max(self.next_frame + self.frame_time, now)
+
+    def get(self):
+        """Take all queued events in the order they arrived."""
+        self.poll()
+        events = list(self.events)
+        self.events.clear()
+        return events
@@ -6,9 +6,13 @@ for extracting the beats of the music.
 Reference: https://gitlab.com/avirzayev/music-visualizer.
 """
 
+import os
 import librosa
+import soundfile
 import numpy as np
+from scipy import sparse
 from model.setting import MUSIC_FOLDER
+from model.cache import ANALYSIS_CACHE
 
 # num of frames being analyzed together
 HOP_LENGTH = 4096
@@ -16,17 +20,131 @@ HOP_LENGTH = 4096
 REPETITION_INTERVAl = 10
 # the minimum duration of a repetitive part
 REPETITION_MIN_DURATION = 3
+# songs with more segments use a banded sparse correlation matrix
+BANDED_MIN_SEGMENTS = 1600
+# the max num of nearest neighbors of a segment in the banded matrix
+BANDED_MAX_NEIGHBORS = 80
+# the memory in bytes that the distances between segments may use at once
+BANDED_WORKING_MEMORY = 64 * 1024 * 1024
+# the visualizer needs thinner hop_length to achieve smoother visualization
+SPECTRUM_HOP_LENGTH = 512
+N_FFT = 2048*4
+# the frame length of the onset detection
+ONSET_N_FFT = 2048
+# the sample rate that music is decoded in, hop lengths are based on it
+DEFAULT_SAMPLE_RATE = 22050
+# the range in decibel below the peak that the spectrum is clipped to
+TOP_DB = 80
+# songs longer than it in sec are analyzed block by block
+STREAMING_MIN_DURATION = 600
+# the num of spectrum frames in one streamed block
+STREAM_BLOCK_LENGTH = 256
+
+# various modes of music freq shown by the visualizer
+BASS = {"start": 50, "end": 100, "count": 12}
+HEAVY = {"start": 120, "end": 250, "count": 40}
+LOW_MIDS = {"start": 251, "end": 2000, "count": 50}
+HIGH_MIDS = {"start": 2001, "end": 6000, "count": 20}
+FREQ_GROUPS = [BASS, HEAVY, LOW_MIDS, HIGH_MIDS]
+
+# parameters that the cached analysis results depend on
+BEATS_PARAMETERS = {'librosa': librosa.__version__, 'hop_length': HOP_LENGTH,
+                    'repetition_interval': REPETITION_INTERVAl,
+                    'repetition_min_duration': REPETITION_MIN_DURATION,
+                    'banded_min_segments': BANDED_MIN_SEGMENTS,
+                    'banded_max_neighbors': BANDED_MAX_NEIGHBORS,
+                    'streaming_min_duration': STREAMING_MIN_DURATION,
+                    'stream_block_length': STREAM_BLOCK_LENGTH, 'onset_n_fft': ONSET_N_FFT}
+BANDS_PARAMETERS = {'librosa': librosa.__version__, 'hop_length': SPECTRUM_HOP_LENGTH,
+                    'n_fft': N_FFT, 'top_db': TOP_DB, 'freq_groups': FREQ_GROUPS,
+                    'streaming_min_duration': STREAMING_MIN_DURATION,
+                    'stream_block_length': STREAM_BLOCK_LENGTH}
+
+class Song():
+    """The Song class represents a music file. It decodes the music
+    only once and shares the samples with every analysis of the music.
+    Long songs are streamed block by block instead of being decoded.
+    """
 
-def get_music_length(filename):
-    """Get the length of the music.
+    def __init__(self, filename, folder=MUSIC_FOLDER):
+        """Song constructor.
+
+        Arguments:
+            filename: The file name of the music file.
+            folder: The folder of the music file.
+        """
+
+        self.filename = filename
+        self.path = os.path.join(folder, filename)
+        self.__music = None
+        self.__freq = None
+        self.__streaming = None
+
+    @property
+    def streaming(self):
+        """Whether the music is long enough to be analyzed block by block.
+        Only files that soundfile can read are streamed.
+        """
+
+        if self.__streaming is None:
+            try:
+                self.__streaming = soundfile.info(self.path).duration > STREAMING_MIN_DURATION
+            except RuntimeError:
+                self.__streaming = False
+        return self.__streaming
+
+    def stream(self, block_length, frame_length, hop_length):
+        """Decode the music block by block in its own sample rate.
+        Consecutive blocks overlap by frame_length - hop_length samples,
+        so that frames of a block never cross into the next one.
+
+        Arguments:
+            block_length: The num of frames in a block.
+            frame_length: The num of samples in a frame.
+            hop_length: The num of samples between frames.
+        Returns:
+            A generator of mono sample arrays.
+        """
+
+        return librosa.stream(self.path, block_length=block_length, frame_length=frame_length,
+                              hop_length=hop_length, mono=True)
+
+    def load(self):
+        """Decode the music file unless it has been decoded.
+
+        Returns:
+            music: An array that represents the music.
+            freq: The frequency of the music array.
+        """
+
+        if self.__music is None:
+            self.__music, self.__freq = librosa.load(self.path)
+        return self.__music, self.__freq
+
+    def release(self):
+        """Release the decoded samples once all analyses are done."""
+        self.__music = None
+        self.__freq = None
+
+def get_music_length(song: Song):
+    """Get the length of the music. The length is cached on disk.
     
     Arguments:
-        filename: The file name of the music file.
+        song: The song of the music file.
     Returns:
         The length of the music in sec.
     """
 
-    return librosa.get_duration(filename=MUSIC_FOLDER+filename)
+    def __analyze():
+        # read the length from the header if possible rather than decoding
+        try:
+            return {'length': soundfile.info(song.path).duration}
+        except RuntimeError:
+            music, freq = song.load()
+            return {'length': librosa.get_duration(y=music, sr=freq)}
+
+    analysis = ANALYSIS_CACHE.fetch(song.path, 'length', {}, __analyze)
+    return float(analysis['length'])
 
 def retrieve_beats(music, freq):
     """Retrieve the beats of a music.
@@ -38,25 +156,198 @@ def retrieve_beats(music, freq):
         An array that contains the time in second that all beats occur.
     """
 
-    beats = librosa.onset.onset_detect(music, freq, units='time')
+    beats = librosa.onset.onset_detect(y=music, sr=freq, units='time')
     return beats
 
-def correlation_matrix(music, freq):
+def correlation_matrix(music, freq, banded=None):
     """Calculate the identical parts among a music.
 
     Arguments:
         music: An array that represents a music.
         freq: The frequency of the music array.
+        banded: A bool whether to calculate a banded sparse matrix,
+                by default only long music does.
     Returns:
         A correlation matrix between music segments.
     """
 
-    chroma = librosa.feature.chroma_cqt(music, freq,
+    chroma = librosa.feature.chroma_cqt(y=music, sr=freq,
                                         hop_length=HOP_LENGTH)
+    return chroma_correlation_matrix(chroma, banded)
+
+def chroma_correlation_matrix(chroma, banded=None):
+    """Calculate the identical parts among a music given its chroma.
+
+    Arguments:
+        chroma: An array of the chroma of music segments.
+        banded: A bool whether to calculate a banded sparse matrix,
+                by default only long music does.
+    Returns:
+        A correlation matrix between music segments.
+    """
+
     chroma_stack = librosa.feature.stack_memory(chroma, n_steps=10, delay=3)
+    if banded is None:
+        banded = chroma_stack.shape[1] > BANDED_MIN_SEGMENTS
+    if banded:
+        return banded_recurrence_matrix(chroma_stack, REPETITION_INTERVAl)
     return librosa.segment.recurrence_matrix(chroma_stack,
                                              width=REPETITION_INTERVAl, sym=True)
 
+def banded_recurrence_matrix(features, width, k=None):
+    """Calculate a sparse recurrence matrix that links every segment with
+    its mutual nearest neighbors. Only the links above the diagonal band
+    are kept since the repetition detection never looks at the others.
+    Distances are calculated chunk by chunk and the num of neighbors is
+    capped, so the memory grows linearly with the num of segments.
+
+    Arguments:
+        features: An array of features with segments in the last axis.
+        width: Segments closer than width are not linked.
+        k: The num of nearest neighbors of each segment, by default
+           2*ceil(sqrt(t - 2*width + 1)) as librosa does, capped by
+           BANDED_MAX_NEIGHBORS.
+    Returns:
+        A sparse boolean matrix with links (i,j) where j >= i + width.
+    """
+
+    features = np.ascontiguousarray(features.T, dtype=np.float64)
+    size = features.shape[0]
+    if k is None:
+        k = min(2 * np.ceil(np.sqrt(size - 2 * width + 1)), BANDED_MAX_NEIGHBORS)
+    k = int(max(1, min(k, size - 1)))
+    norms = np.einsum('ij,ij->i', features, features)
+    # each chunk holds the products, the distances and the sorted indexes
+    chunk = max(1, BANDED_WORKING_MEMORY // (3 * 8 * size))
+    band = np.arange(1 - width, width)
+
+    # links to later segments, and links to earlier segments in reversed direction
+    forward, backward = [], []
+    for start in range(0, size, chunk):
+        rows = np.arange(start, min(start + chunk, size))
+        distances = features[rows] @ features.T
+        distances *= -2
+        distances += norms[rows, None]
+        distances += norms[None, :]
+        # remove connections within width
+        band_cols = rows[:, None] + band[None, :]
+        inside = (band_cols >= 0) & (band_cols < size)
+        distances[np.broadcast_to(rows[:, None] - start, band_cols.shape)[inside],
+                  band_cols[inside]] = np.inf
+        neighbors = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        linked = np.isfinite(np.take_along_axis(distances, neighbors, axis=1))
+        links_i = np.broadcast_to(rows[:, None], neighbors.shape)[linked]
+        links_j = neighbors[linked]
+        later = links_j > links_i
+        forward.append(links_i[later] * size + links_j[later])
+        backward.append(links_j[~later] * size + links_i[~later])
+        del distances, neighbors
+
+    # keep the links that are in both directions
+    links = np.concatenate(forward)
+    links = links[np.isin(links, np.concatenate(backward), assume_unique=True)]
+    links_i, links_j = np.divmod(links, size)
+    return sparse.csr_matrix((np.ones(links.shape[0], dtype=bool), (links_i, links_j)),
+                             shape=(size, size))
+
+def get_diagonal_runs(R, min_offset):
+    """Find the runs of continuously correlated segments along the
+    diagonals of a correlation matrix.
+
+    Arguments:
+        R: A correlation matrix between music segments,
+           either a dense array or a sparse matrix.
+        min_offset: The min offset of the diagonals being searched.
+    Returns:
+        starts: An array of the first segment of every run.
+        offsets: An array of the offset of the diagonal of every run.
+        lengths: An array of the num of segments in every run.
+    """
+
+    rows, cols = R.nonzero()
+    offsets = cols - rows
+    related = offsets >= min_offset
+    rows, offsets = rows[related], offsets[related]
+    # sort by diagonals then by segments
+    order = np.lexsort((rows, offsets))
+    rows, offsets = rows[order], offsets[order]
+
+    # a new run starts if the diagonal changes or the segments are not continuous
+    run_starts = np.ones(rows.shape[0], dtype=bool)
+    run_starts[1:] = (offsets[1:] != offsets[:-1]) | (rows[1:] != rows[:-1] + 1)
+    run_starts = np.flatnonzero(run_starts)
+    lengths = np.diff(np.append(run_starts, rows.shape[0]))
+    return rows[run_starts], offsets[run_starts], lengths
+
+def label_repetition(R, min_repetition):
+    """Partition segments into categories given their correlation.
+    Two groups of segments are in the same category if at least
+    min_repetition continuous segments of them are correlated.
+
+    Arguments:
+        R: A correlation matrix between music segments,
+           either a dense array or a sparse matrix.
+        min_repetition: The minimum num of continuous segments need to be correlated.
+    Returns:
+        An array that partitions segments into categories, where
+        category 0 means the default category.
+    """
+
+    size = R.shape[0]
+    # the width between two possible related segments
+    width = min_repetition + REPETITION_INTERVAl
+    # only segments before the limit can start a repetition
+    limit = size - min_repetition
+
+    # runs that are long enough to hold a repetition
+    starts, offsets, lengths = get_diagonal_runs(R, width)
+    long_runs = lengths >= min_repetition
+    starts, offsets, lengths = starts[long_runs], offsets[long_runs], lengths[long_runs]
+
+    # every pair i,j that starts min_repetition correlated segments in a run
+    counts = lengths - min_repetition + 1
+    runs = np.repeat(np.arange(counts.shape[0]), counts)
+    steps = np.arange(runs.shape[0]) - np.repeat(np.cumsum(counts) - counts, counts)
+    pairs_i = starts[runs] + steps
+    pairs_j = pairs_i + offsets[runs]
+    # the end of the run that the pair may be extended to
+    pairs_end = starts[runs] + lengths[runs]
+
+    in_range = pairs_j < limit
+    pairs_i, pairs_j, pairs_end = pairs_i[in_range], pairs_j[in_range], pairs_end[in_range]
+    order = np.lexsort((pairs_j, pairs_i))
+    pairs_i, pairs_j, pairs_end = pairs_i[order], pairs_j[order], pairs_end[order]
+
+    # a repetition array that partitions segments into categories
+    repetition = np.zeros(size, dtype=int)
+    current_category = 1
+    last_i, skip_i, next_j = -1, False, 0
+
+    # pairs are visited in the same order as scanning R row by row,
+    # since the labels assigned earlier decide whether a pair is taken
+    for i, j, end in zip(pairs_i.tolist(), pairs_j.tolist(), pairs_end.tolist()):
+        if i != last_i:
+            last_i = i
+            skip_i = repetition[i:i+min_repetition].any()
+            next_j = 0
+        if skip_i or j < next_j or repetition[j:j+min_repetition].any():
+            continue
+
+        if not repetition[i]:
+            # create a new category if found new related i,j
+            category = current_category
+            current_category += 1
+        else:
+            category = repetition[i]
+
+        # assigned i,j to the same category and extend them till the run ends
+        span = end - i
+        repetition[i:i+span] = category
+        repetition[j:j+span] = category
+        next_j = j + min_repetition + 1
+
+    return repetition
+
 def retrieve_repetition(music, freq):
     """Partition the music into segments with a label of their repeating
     patterns.
@@ -78,117 +369,298 @@ def retrieve_repetition(music, freq):
     seg_length = music.shape[0] / freq / R.shape[0]
     # the minimum num of continuous segments need to be correlated
     min_repetition = int(REPETITION_MIN_DURATION // seg_length)
-    # a helper indices from 0 to min_repetition
-    indices = np.arange(min_repetition, dtype=int)
-    # the width between two possible related segments
-    width = min_repetition + REPETITION_INTERVAl
 
-    # a repetition array that partitions segments into categories
-    repetition = np.zeros(R.shape[0], dtype=int)
-    current_category = 1
+    return label_repetition(R, min_repetition), seg_length
 
-    def __set_patterns(index_i, index_j, category):
-        # assigned i,j to the same category
-        repetition[indices+index_i] = category
-        repetition[indices+j] = category
-        index_i += min_repetition
-        index_j += min_repetition
-
-        # try to extend i,j for further correlation
-        while R[index_i,index_j] and j < R.shape[0] - min_repetition:
-            repetition[index_i] = category
-            repetition[index_j] = category
-            index_i += 1
-            index_j += 1
-
-    # loop through R
-    i = 0
-    while i < R.shape[0] - min_repetition:
-        if repetition[indices+i].any():
-            i += 1
-            continue
+def get_frequency_bands(freq_groups=FREQ_GROUPS):
+    """Split the frequency groups into the bands that the bars of the
+    visualizer show.
 
-        # loop through R to find segments that are related to segment i
-        j = i + width
-        while j < R.shape[0] - min_repetition:
-            if not repetition[indices+j].any() and R[(indices+i,indices+j)].all():
-                if not repetition[i]:
-                    # create a new category if found new related i,j
-                    category = current_category
-                    current_category += 1
-                else:
-                    category = repetition[i]
-
-                __set_patterns(i, j, category)
-                j += min_repetition
-            j += 1
-        i += 1
-    
-    return repetition, seg_length
+    Arguments:
+        freq_groups: A list of dicts with the start, the end and the
+                     num of bands of every group.
+    Returns:
+        A list of groups, each of which is a list of arrays of
+        the frequencies in one band.
+    """
+
+    bands = []
+    for frequencies in freq_groups:
+        freq_channels = []
+        s = frequencies["end"] - frequencies["start"]
+        count = frequencies["count"]
+        reminder = s%count
+        step = int(s/count)
+        rng = frequencies["start"]
+
+        for _ in range(count):
+            if reminder > 0:
+                reminder -= 1
+                channel = np.arange(rng, rng+step+2)
+                rng += step + 3
+            else:
+                channel = np.arange(rng, rng+step+1)
+                rng += step + 2
+            freq_channels.append(channel)
+
+        bands.append(freq_channels)
+    return bands
+
+def get_band_weights(bands, frequencies_index_ratio, bin_num):
+    """Get a sparse matrix that averages the spectrum bins of every band.
+    A frequency is mapped into the bin int(freq * frequencies_index_ratio),
+    so a row times a spectrum frame is the mean decibel over the band.
 
-def get_patterned_beats(filename, time_delay=0):
+    Arguments:
+        bands: A list of arrays of the frequencies in one band.
+        frequencies_index_ratio: The ratio that maps frequencies into bins.
+        bin_num: The num of bins of the spectrum.
+    Returns:
+        A sparse matrix in shape (num of bands, bin_num).
+    """
+
+    rows = np.concatenate([np.full(len(band), index) for index, band in enumerate(bands)])
+    bins = np.concatenate([(np.asarray(band) * frequencies_index_ratio).astype(int)
+                           for band in bands])
+    weights = np.concatenate([np.full(len(band), 1 / len(band)) for band in bands])
+    # weights of a frequency that shares the bin with others are summed up
+    return sparse.csr_matrix((weights, (rows, bins)), shape=(len(bands), bin_num))
+
+def analyze_stream(song: Song):
+    """Analyze a long music block by block, so that the memory stays the
+    same regardless of the length of the music. Blocks are decoded in the
+    sample rate of the music file with frames scaled to last as long as the
+    ones in the default rate. Frames never cross blocks, thus only
+    small results of every frame are accumulated: the onset envelope,
+    the chroma of segments and the decibel of visualizer bands.
+
+    It approximates the analysis of a decoded music in a few ways. Decibels
+    are clipped TOP_DB below the loudest frame so far rather than below the
+    peak of the whole music, and the chroma comes from the stft rather than
+    the cqt.
+
+    Arguments:
+        song: The song of the music file.
+    Returns:
+        beats: A dict with the time in second that all beats occur,
+               the repetition array and the segment length.
+        bands: A dict with the table of the decibel of every visualizer
+               band over time and the ratio that maps time into its indexes.
+    """
+
+    info = soundfile.info(song.path)
+    sample_rate = info.samplerate
+    # frames last as long as the ones of a music decoded in the default rate
+    scale = sample_rate / DEFAULT_SAMPLE_RATE
+    n_fft, onset_n_fft = round(N_FFT * scale), round(ONSET_N_FFT * scale)
+    hop_length = round(SPECTRUM_HOP_LENGTH * scale)
+    segment_step = HOP_LENGTH // SPECTRUM_HOP_LENGTH
+    frequencies = librosa.fft_frequencies(sr=sample_rate, n_fft=n_fft)
+    bands = [band for group in get_frequency_bands() for band in group]
+    band_weights = get_band_weights(bands, len(frequencies)/frequencies[-1], len(frequencies))
+
+    # the table is the only result that grows with the frames, keep it in half precision
+    # and start it with silent frames, so that frames are placed at their middle
+    # as the centered frames of the stft
+    pad = n_fft // 2 // hop_length
+    band_table = np.full((pad + max(0, 1 + (info.frames - n_fft) // hop_length), len(bands)),
+                         -np.inf, dtype=np.float16)
+    onset_envelope, chroma = [], []
+    max_decibel, max_mel_decibel = -np.inf, -np.inf
+    last_mel, onset_tail = None, np.empty(0)
+    frame_num = 0
+    for block in song.stream(STREAM_BLOCK_LENGTH, n_fft, hop_length):
+        # the last block may be too short to hold a frame
+        if block.shape[0] < n_fft:
+            break
+        power = np.abs(librosa.stft(block, n_fft=n_fft, hop_length=hop_length,
+                                    center=False)) ** 2
+        block_frames = power.shape[1]
+
+        # the mean decibel of visualizer bands
+        decibel = librosa.power_to_db(power, top_db=None)
+        max_decibel = max(max_decibel, decibel.max())
+        np.maximum(decibel, max_decibel - TOP_DB, out=decibel)
+        band_table[pad+frame_num:pad+frame_num+block_frames] = (band_weights @ decibel).T
+        del decibel
+
+        # the onset strength from the mel spectrum of shorter frames at the same hops,
+        # which fit a few more frames into a block than the ones of the spectrum
+        onset_power = np.abs(librosa.stft(block, n_fft=onset_n_fft, hop_length=hop_length,
+                                          center=False)) ** 2
+        mel = librosa.power_to_db(librosa.feature.melspectrogram(S=onset_power, sr=sample_rate,
+                                                                 n_fft=onset_n_fft), top_db=None)
+        max_mel_decibel = max(max_mel_decibel, mel.max())
+        np.maximum(mel, max_mel_decibel - TOP_DB, out=mel)
+        # the first frame has no onset since nothing is before it
+        previous = mel[:, :1] if last_mel is None else last_mel
+        envelope = np.maximum(0, np.diff(mel, axis=1, prepend=previous)).mean(axis=0)
+        onset_envelope.append(envelope[:block_frames])
+        # the frames after the block are only kept once the last block is done
+        onset_tail = envelope[block_frames:]
+        last_mel = mel[:, block_frames-1:block_frames]
+
+        # the chroma of frames that start a segment
+        segments = np.arange(-frame_num % segment_step, block_frames, segment_step)
+        chroma.append(librosa.feature.chroma_stft(S=power[:, segments], sr=sample_rate,
+                                                  n_fft=n_fft, tuning=0.0))
+        frame_num += block_frames
+
+    onset_envelope.append(onset_tail)
+    onsets = librosa.onset.onset_detect(onset_envelope=np.concatenate(onset_envelope),
+                                        sr=sample_rate, hop_length=hop_length)
+    # frames are placed at their middle, then shifted by half a frame as librosa
+    # does to counteract that a frame sees an onset before its middle
+    beats = (onsets * hop_length + onset_n_fft) / sample_rate
+
+    R = chroma_correlation_matrix(np.concatenate(chroma, axis=1))
+    seg_length = info.duration / R.shape[0]
+    min_repetition = int(REPETITION_MIN_DURATION // seg_length)
+    repetition = label_repetition(R, min_repetition)
+
+    band_table = band_table[:pad+frame_num]
+    band_table -= max_decibel
+    np.maximum(band_table, -TOP_DB, out=band_table)
+    last_time = librosa.frames_to_time(band_table.shape[0] - 1, sr=sample_rate,
+                                       hop_length=hop_length, n_fft=n_fft)
+
+    return ({'beats': beats, 'repetition': repetition, 'seg_length': seg_length},
+            {'band_table': band_table, 'time_index_ratio': band_table.shape[0] / last_time})
+
+def analyze_beats(song: Song):
     """Retrieve the beats of a music file and analyze its
     repeting patterns.
 
     Arguments:
-        filename: The file name of the music file.
+        song: The song of the music file.
     Returns:
-        beats: A list of time in ms that beats occur.
-        patterns: A list of patterns corresponding to beats
-                  where pattern 0 means the default pattern
-                  (no pattern).
+        A dict with the time in second that all beats occur,
+        the repetition array and the segment length.
     """
 
-    music, freq = librosa.load(MUSIC_FOLDER+filename)
+    if song.streaming:
+        beats, bands = analyze_stream(song)
+        # the same pass analyzes the bands, keep them for the visualizer
+        ANALYSIS_CACHE.save(song.path, 'bands', BANDS_PARAMETERS, bands)
+        return beats
+
+    music, freq = song.load()
     # get rhythm of the music
     beats = retrieve_beats(music, freq)
-    # filter out the starting part
-    beats = beats[beats>time_delay]
     # get repetition
     repetition, seg_length = retrieve_repetition(music, freq)
+    return {'beats': beats, 'repetition': repetition, 'seg_length': seg_length}
+
+def get_patterned_beats(song: Song, time_delay=0):
+    """Retrieve the beats of a music file and analyze its
+    repeting patterns. The analysis is cached on disk.
+
+    Arguments:
+        song: The song of the music file.
+    Returns:
+        beats: An array of time in ms that beats occur.
+        patterns: An array of patterns corresponding to beats
+                  where pattern 0 means the default pattern
+                  (no pattern).
+    """
+
+    analysis = ANALYSIS_CACHE.fetch(song.path, 'beats', BEATS_PARAMETERS,
+                                    lambda: analyze_beats(song))
+    beats, repetition = analysis['beats'], analysis['repetition']
+    seg_length = float(analysis['seg_length'])
+    # filter out the starting part
+    beats = beats[beats>time_delay]
     # assign beats into these patterns
     patterns = repetition[(beats / seg_length).astype(int)]
     # convert into ms
     beats = beats * 1000
-    # return a list so that we can pop the elements when circles are added
-    return list(beats), list(patterns)
+    return beats, patterns.astype(int)
 
 class MusicAnalyzer():
-    """The MusicAnalyzer class analyzes the music features over time."""
+    """The MusicAnalyzer class analyzes the music features over time.
+    Only the mean decibel of every visualizer band is kept, so that
+    a frame of the visualizer takes one row of the band table.
+    """
 
     def __init__(self):
         """MusicAnalyzer constructor."""
-        self.frequencies_index_ratio = None  # array for frequencies
         self.time_index_ratio = None  # array for time
-        self.spectrogram = None  # decibels corresponding to frequency and time
-
-    def load(self, music_file):
-        """Load a music and analyze."""
-        # needs thinner hop_length to achieve smoother visualization
-        HOP_LENGTH = 512
-        N_FFT = 2048*4
-
-        music, sample_rate = librosa.load(MUSIC_FOLDER+music_file)
+        self.band_table = None  # decibels corresponding to time and visualizer bands
+
+    def load(self, song: Song):
+        """Load a music and analyze. The analysis is cached on disk.
+        Long songs are streamed rather than decoded.
+        """
+
+        analyze = MusicAnalyzer.analyze_stream if song.streaming else MusicAnalyzer.analyze
+        analysis = ANALYSIS_CACHE.fetch(song.path, 'bands', BANDS_PARAMETERS,
+                                        lambda: analyze(song))
+        self.band_table = analysis['band_table'].astype(np.float32)
+        self.time_index_ratio = float(analysis['time_index_ratio'])
+
+    @staticmethod
+    def analyze(song: Song):
+        """Analyze the music features over time.
+
+        Arguments:
+            song: The song of the music file.
+        Returns:
+            A dict with the table of the decibel of every visualizer band
+            over time and the ratio that maps time into its indexes.
+        """
+
+        music, sample_rate = song.load()
         # getting music features(amp & freq) over time
-        stft = np.abs(librosa.stft(music, hop_length=HOP_LENGTH, n_fft=N_FFT))
+        stft = np.abs(librosa.stft(music, hop_length=SPECTRUM_HOP_LENGTH, n_fft=N_FFT))
         # converting feature to decibal
-        self.spectrogram = librosa.amplitude_to_db(stft, ref=np.max)
+        spectrogram = librosa.amplitude_to_db(stft, ref=np.max)
+        del stft
         # converting feature to frequencies
-        frequencies = librosa.core.fft_frequencies(n_fft=N_FFT)
+        frequencies = librosa.core.fft_frequencies(sr=sample_rate, n_fft=N_FFT)
         # getting time for features
-        times = librosa.core.frames_to_time(np.arange(self.spectrogram.shape[1]),
-                                            sr=sample_rate, hop_length=HOP_LENGTH, n_fft=N_FFT)
-
-        self.time_index_ratio = len(times)/times[len(times) - 1]
-        self.frequencies_index_ratio = len(frequencies)/frequencies[len(frequencies)-1]
-
-    def get_decibel(self, target_time, freq):
-        """Get amp in decibel of a music in the given time."""
-        return self.spectrogram[int(freq*self.frequencies_index_ratio)][int(target_time*self.time_index_ratio)]
-
-    def get_decibel_array(self, target_time, freq_array):
-        """Get a list of amp in decibel in the given time."""
-        decibel_array = []
-        for freq in freq_array:
-            decibel_array.append(self.get_decibel(target_time,freq))
-        return decibel_array
+        times = librosa.core.frames_to_time(np.arange(spectrogram.shape[1]),
+                                            sr=sample_rate, hop_length=SPECTRUM_HOP_LENGTH, n_fft=N_FFT)
+
+        # averaging the bins of every band, then the spectrogram can be dropped
+        bands = [band for group in get_frequency_bands() for band in group]
+        band_weights = get_band_weights(bands, len(frequencies)/frequencies[len(frequencies)-1],
+                                        len(frequencies))
+        band_table = (band_weights @ spectrogram).T
+
+        # half precision is accurate enough for decibels and halves the entry size
+        return {'band_table': band_table.astype(np.float16),
+                'time_index_ratio': len(times)/times[len(times) - 1]}
+
+    @staticmethod
+    def analyze_stream(song: Song):
+        """Analyze the decibel of visualizer bands over time block by block.
+
+        Arguments:
+            song: The song of the music file.
+        Returns:
+            A dict with the table of the decibel of every band over time
+            and the ratio that maps time into its indexes.
+        """
+
+        beats, bands = analyze_stream(song)
+        # the same pass analyzes the beats, keep them for the game
+        ANALYSIS_CACHE.save(song.path, 'beats', BEATS_PARAMETERS, beats)
+        return bands
+
+    def get_band_decibels(self, target_time):
+        """Get the mean decibel of every visualizer band in the given time."""
+        index = min(int(target_time*self.time_index_ratio), self.band_table.shape[0] - 1)
+        return self.band_table[max(0, index)]
+
+def analyze_song(filename, folder=MUSIC_FOLDER):
+    """Run every analysis of a music file so that the results are cached.
+
+    Arguments:
+        filename: The file name of the music file.
+        folder: The folder of the music file.
+    """
+
+    song = Song(filename, folder)
+    get_music_length(song)
+    get_patterned_beats(song)
+    MusicAnalyzer().load(song)
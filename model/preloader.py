@@ -0,0 +1,122 @@
+"""Program Description
+
+The preloader.py program analyzes the music library in background
+processes while the menu is open. Results are shared through the
+analysis cache, so the game only loads them once it starts.
+"""
+
+import os
+import logging
+import threading
+import multiprocessing
+from model.setting import MUSIC_FOLDER, CACHE_FOLDER
+from model.cache import ANALYSIS_CACHE
+from model.music import analyze_song
+
+# an analysis takes up to about 850 MB for a 5 minute song, thus only a few run at once
+MAX_DEFAULT_WORKERS = 2
+
+def init_worker(cache_folder):
+    """Point the analysis cache of a worker process at the given folder."""
+    ANALYSIS_CACHE.folder = cache_folder
+
+class AnalysisPreloader():
+    """The AnalysisPreloader class runs the analyses of music files in a
+    process pool. Files are analyzed in order, and a file can be moved to
+    the front of the queue once it is selected.
+    """
+
+    def __init__(self, music_files, workers=None, folder=MUSIC_FOLDER, cache_folder=CACHE_FOLDER):
+        """AnalysisPreloader constructor.
+
+        Arguments:
+            music_files: A list of file names of the music files.
+            workers: The num of worker processes, by default one less
+                     than the num of cpus so that the menu stays smooth,
+                     but no more than MAX_DEFAULT_WORKERS.
+            folder: The folder of the music files.
+            cache_folder: The folder of the analysis cache that results are saved into.
+        """
+
+        self.workers = workers if workers else \
+            max(1, min(MAX_DEFAULT_WORKERS, (os.cpu_count() or 1) - 1))
+        self.folder = folder
+        self.pending = list(music_files)
+        self.results = {}
+        self.running = 0
+        self.closed = False
+        self.condition = threading.Condition()
+        # spawn works the same on every platform and does not fork the display
+        self.pool = multiprocessing.get_context('spawn').Pool(self.workers, init_worker,
+                                                              (cache_folder,))
+        self.dispatcher = threading.Thread(target=self.__dispatch, daemon=True)
+        self.dispatcher.start()
+
+    def __dispatch(self):
+        """Submit pending files whenever a worker is free."""
+        with self.condition:
+            while True:
+                while not self.closed and (not self.pending or self.running >= self.workers):
+                    self.condition.wait()
+                if self.closed:
+                    return
+                self.__submit(self.pending.pop(0))
+
+    def __submit(self, filename):
+        """Submit a file to the pool, the condition must be held."""
+        self.running += 1
+        self.results[filename] = self.pool.apply_async(analyze_song, (filename, self.folder),
+                                                       callback=self.__on_done,
+                                                       error_callback=self.__on_done)
+
+    def __on_done(self, _):
+        """Free the worker once an analysis is done."""
+        with self.condition:
+            self.running -= 1
+            self.condition.notify_all()
+
+    def prioritize(self, filename):
+        """Analyze the given file before the other pending files."""
+        with self.condition:
+            if filename in self.pending:
+                self.pending.remove(filename)
+                self.pending.insert(0, filename)
+                self.condition.notify_all()
+
+    def wait(self, filename):
+        """Wait until the given file is analyzed.
+
+        Arguments:
+            filename: The file name of the music file.
+        Returns:
+            A bool whether the analysis succeeded, the game will
+            analyze the file by itself otherwise.
+        """
+
+        with self.condition:
+            if self.closed:
+                return False
+            if filename in self.pending:
+                self.pending.remove(filename)
+                self.__submit(filename)
+            result = self.results.get(filename)
+        if result is None:
+            return False
+
+        try:
+            result.get()
+        except Exception as error:
+            logging.warning('Failed to analyze %s in background: %s', filename, error)
+            return False
+        return True
+
+    def close(self):
+        """Stop all analyses so that they do not slow down the game."""
+        with self.condition:
+            self.closed = True
+            self.pending.clear()
+            self.condition.notify_all()
+        # an analysis killed while it is saved leaves a temporary file, which the cache evicts
+        self.pool.terminate()
+        self.pool.join()
+        self.dispatcher.join()
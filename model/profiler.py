@@ -0,0 +1,200 @@
+"""Program Description
+
+The profiler.py program holds a StageTimer class that measures how long
+every stage of a frame takes, so that the game loop can be profiled
+without a profiler slowing it down. Whole sessions can also be run
+under cProfile.
+"""
+
+import csv
+import json
+import time
+import cProfile
+import numpy as np
+
+# num of recent frames that the overlay summarizes
+RECENT_FRAME_NUM = 500
+# percentiles of the frame time being reported
+PERCENTILES = (50, 99)
+# stages that wait for the next frame rather than work on one
+IDLE_STAGES = ('wait',)
+
+class StageTimer():
+    """The StageTimer class records the time spent in named stages of
+    every frame. A stage ends where the next one starts, so stage() is
+    called after the code of every stage. Recording a stage only reads
+    the performance counter and adds to a list, thus it costs far less
+    than a microsecond.
+    The recent frames are kept in a ring of fixed size, every frame is
+    only kept if it is asked for.
+    """
+
+    def __init__(self, keep_all=False, recent_frame_num=RECENT_FRAME_NUM):
+        """StageTimer constructor.
+
+        Arguments:
+            keep_all: Whether the stage times of every frame are kept,
+                      or only those of the recent frames.
+            recent_frame_num: The num of recent frames being kept.
+        """
+
+        # names of stages in the order they first end, and their column in records
+        self.names = []
+        self.columns = {}
+        # the time in sec of every stage of the recent frames, a row for every frame
+        self.recent = np.zeros((recent_frame_num, 0))
+        # rows of the frames before the current one if every frame is kept
+        self.history = [] if keep_all else None
+        # the stage times of the current frame, which are stored in its row of the ring
+        self.record = []
+        self.frames = 0
+        self.row = 0
+        self.last_time = time.perf_counter()
+
+    def store_record(self):
+        """Store the stage times of the current frame in the ring."""
+        if self.recent.shape[1] < len(self.names):
+            # new stages are rare, thus the ring is only widened for them
+            self.recent = np.pad(self.recent, ((0, 0), (0, len(self.names) - self.recent.shape[1])))
+        self.recent[self.row] = 0
+        self.recent[self.row, :len(self.record)] = self.record
+
+    def start_frame(self):
+        """Start timing a new frame."""
+        if self.frames:
+            self.store_record()
+            if self.history is not None:
+                self.history.append(self.recent[self.row].copy())
+        self.row = self.frames % self.recent.shape[0]
+        self.record = [0.0] * len(self.names)
+        self.frames += 1
+        self.last_time = time.perf_counter()
+
+    def stage(self, name):
+        """End the current stage and start the next one.
+
+        Arguments:
+            name: The name of the stage that ends.
+        """
+
+        now = time.perf_counter()
+        column = self.columns.get(name)
+        if column is None:
+            column = self.columns[name] = len(self.names)
+            self.names.append(name)
+        record = self.record
+        if column >= len(record):
+            record.extend([0.0] * (column + 1 - len(record)))
+        record[column] += now - self.last_time
+        self.last_time = now
+
+    def get_table(self, frame_num=None):
+        """Get the recorded stage times as a table.
+
+        Arguments:
+            frame_num: The num of the most recent frames, all frames kept if not given.
+        Returns:
+            An array of the time in ms, a row for every frame and
+            a column for every stage in the order of names.
+        """
+
+        if self.frames:
+            self.store_record()
+        ring_size = self.recent.shape[0]
+        if self.history is not None and (frame_num is None or frame_num > ring_size):
+            rows = self.history + [self.recent[self.row]] if self.frames else []
+            rows = rows[-frame_num:] if frame_num else rows
+            table = np.zeros((len(rows), len(self.names)))
+            for index, row in enumerate(rows):
+                table[index, :row.shape[0]] = row
+        else:
+            num = min(self.frames, ring_size, frame_num or ring_size)
+            table = self.recent[np.arange(self.frames - num, self.frames) % ring_size]
+        return table * 1000
+
+    def means(self):
+        """Get the mean time of every stage.
+
+        Returns:
+            A dict of the time in ms that every stage takes per frame.
+        """
+
+        return dict(zip(self.names, self.get_table().mean(axis=0) if self.frames else []))
+
+    def summary(self, frame_num=None):
+        """Summarize the frame times.
+
+        Arguments:
+            frame_num: The num of the most recent frames, all frames kept if not given.
+        Returns:
+            A dict of the num of frames, the mean and the percentiles of
+            the frame time and of the work time, which leaves out idle
+            stages, in ms, and the working stage that takes the longest.
+        """
+
+        table = self.get_table(frame_num)
+        if not table.shape[0]:
+            return {'frames': 0}
+        working = [column for column, name in enumerate(self.names) if name not in IDLE_STAGES]
+        frame_times = table.sum(axis=1)
+        work_times = table[:, working].sum(axis=1)
+        summary = {'frames': table.shape[0], 'mean': float(frame_times.mean()),
+                   'work_mean': float(work_times.mean())}
+        for percentile in PERCENTILES:
+            summary['p%d' % percentile] = float(np.percentile(frame_times, percentile))
+            summary['work_p%d' % percentile] = float(np.percentile(work_times, percentile))
+        if working:
+            stage_means = table[:, working].mean(axis=0)
+            summary['slowest_stage'] = self.names[working[int(stage_means.argmax())]]
+            summary['slowest_stage_mean'] = float(stage_means.max())
+        return summary
+
+    def get_overlay_lines(self):
+        """Get the lines of text that the overlay shows."""
+        summary = self.summary(RECENT_FRAME_NUM)
+        if not summary['frames']:
+            return []
+        # the overlay is rendered in the middle of a frame, thus it shows the one before
+        last_frame = self.get_table(2)[0]
+        last_work = sum(value for name, value in zip(self.names, last_frame)
+                        if name not in IDLE_STAGES)
+        lines = ['frame %.2f ms  work %.2f ms' % (last_frame.sum(), last_work),
+                 'p50 %.2f ms  p99 %.2f ms' % (summary['p50'], summary['p99']),
+                 'work p50 %.2f ms  p99 %.2f ms' % (summary['work_p50'], summary['work_p99'])]
+        if 'slowest_stage' in summary:
+            lines.append('slowest %s %.2f ms' % (summary['slowest_stage'],
+                                                 summary['slowest_stage_mean']))
+        return lines
+
+    def save(self, path):
+        """Save the recorded stage times, as a json summary if the path
+        ends with .json, or else as a csv table of every frame kept.
+        """
+
+        if path.endswith('.json'):
+            report = {'summary': self.summary(), 'stage_means': self.means()}
+            with open(path, 'w') as file:
+                json.dump(report, file, indent=2)
+        else:
+            with open(path, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(['frame'] + self.names)
+                for frame, row in enumerate(self.get_table()):
+                    writer.writerow([frame] + ['%.4f' % value for value in row])
+
+def run_profiled(function, path):
+    """Run a function under cProfile and write the profile into a file,
+    which can be read with pstats or snakeviz.
+
+    Arguments:
+        function: The function to run without arguments.
+        path: The path of the profile file.
+    Returns:
+        The result of the function.
+    """
+
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(function)
+    finally:
+        profile.dump_stats(path)
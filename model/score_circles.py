@@ -6,66 +6,76 @@ for missing circles and key pressing.
 """
 
 from model.track import Track
-from model.utils import report_error
+from model.board import get_boards
 
-# some constants on rating accuracies in sec
-MISS = -0.25
-PERFECT = 0.08
-GOOD = 0.15
-BAD = 0.25
+# some constants on rating accuracies in ms
+MISS = -250
+PERFECT = 80
+GOOD = 150
+BAD = 250
 MISS_SCORE = -20
 PERFECT_SCORE = 8
 GOOD_SCORE = 3
 BAD_SCORE = -5
-# duration of displaying performance in sec
-PERFORM_DURATION = 0.3
+# duration of displaying performance in ms
+PERFORM_DURATION = 300
 
-def score_miss(track_dict, frame, velocity):
+def get_press_time(event, time, input_offset=0):
+    """Get the music time that a key is pressed at. Events that are
+    stamped on arrival carry their own time, others are taken as
+    pressed when they are read. The input offset only applies to real
+    presses, since autoplay presses are exactly on time.
+
+    Arguments:
+        event: The key_down event.
+        time: The time in ms that the event is read at.
+        input_offset: The latency in ms of key presses against the music.
+    Returns:
+        The time in ms that the press is judged by.
+    """
+
+    if getattr(event, 'autoplay', False):
+        return event.time
+    return getattr(event, 'time', time) - input_offset
+
+def score_miss(track_dict, time):
     """Iterate through all tracks and check any missed circles.
 
     Arguments:
         track_dict: A dict with values being tracks.
-        frame: The frame rate.
-        velocity: The velocity.
+        time: The time in ms since the music started.
     Returns:
         A boolean whether there is a miss
     """
 
-    # check arguments
-    if frame <= 0 or velocity <= 0:
-        report_error('Invalid frame rate or velocity')
+    # remove missed circles of every board at once, several may be missed after a lag
+    missed = {id(board): board.expire(time + MISS) for board in get_boards(track_dict)}
 
     score = 0
     # loop through all tracks
     for track in track_dict.values():
         # update perform flag of the track
-        track.update_perform(PERFORM_DURATION * frame)
+        track.update_perform(PERFORM_DURATION)
 
-        # find any missed circle
-        if calculate_accuracy(track, frame, velocity) < MISS:
-            score += MISS_SCORE
+        # score missed circles
+        missed_num = missed[id(track.board)][track.lane]
+        if missed_num:
+            score += MISS_SCORE * int(missed_num)
             track.set_miss()
-            # remove missed circle
-            track.remove_circle()
     return score
 
-def score_press(event, track_dict, mode, frame, velocity):
+def score_press(event, track_dict, mode, time):
     """Iterate through all tracks and check any missed circles.
 
     Arguments:
         event: The key_down event.
         track_dict: A dict with values being tracks.
         mode: The key set of the game.
-        frame: The frame rate.
-        velocity: The velocity.
+        time: The time in ms since the music started.
     Returns:
         A boolean whether there is a valid click
     """
 
-    # check arguments
-    if frame <= 0 or velocity <= 0:
-        report_error('Invalid frame rate or velocity')
-
     # get the pressed key
     index = mode.get(event.key, 0)
     # return 0 for invalid key pressing
@@ -74,7 +84,7 @@ def score_press(event, track_dict, mode, frame, velocity):
     # get corresponding track
     track = track_dict[index]
     # calculate accuracy
-    accuracy = abs(calculate_accuracy(track, frame, velocity))
+    accuracy = abs(calculate_accuracy(track, time))
     # set score and perform
     score = 0
     if accuracy < PERFECT:
@@ -91,16 +101,14 @@ def score_press(event, track_dict, mode, frame, velocity):
         track.remove_circle()
     return score
 
-def calculate_accuracy(track: Track, frame, velocity):
+def calculate_accuracy(track: Track, time):
     """Calculate the accuracy of the most front circle.
 
     Arguments:
         track: The track containing circles and a key.
-        frame: The frame rate.
-        velocity: The velocity of circles falling.
+        time: The time in ms since the music started.
     Returns:
-        The time needed for the frontest circle to flow to the key in sec.
+        The time needed for the frontest circle to flow to the key in ms.
     """
 
-    displacement = track.height - track.get_front_circle()
-    return displacement / velocity / frame
\ No newline at end of file
+    return track.get_front_circle() - time
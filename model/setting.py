@@ -7,8 +7,25 @@ import pygame
 
 MUSIC_FOLDER = './res/music/'
 IMAGE_FOLDER = './res/image/'
+CHART_FOLDER = './res/chart/'
+CACHE_FOLDER = './res/cache/'
+# max size of the analysis cache in bytes
+CACHE_SIZE = 256 * 1024 * 1024
+# the folder of scaled images kept on disk as raw pixels, None to keep them in memory only
+ASSET_CACHE_FOLDER = CACHE_FOLDER + 'assets/'
+# max size of the images kept in memory and on disk in bytes
+ASSET_CACHE_SIZE = 128 * 1024 * 1024
+ASSET_DISK_CACHE_SIZE = 256 * 1024 * 1024
 CAPTION = 'Music Game'
-FRAME_RATE = 30
+# the game runs on the music time, so the frame rate only caps the rendering
+FRAME_RATE = 144
+# environment variables that switch on the profiling of a game:
+# show the frame times on the screen if set to 1
+OVERLAY_ENV = 'MUSIC_GAME_OVERLAY'
+# dump the stage times into the file at the end, a csv table of every frame or a json summary
+FRAME_STATS_ENV = 'MUSIC_GAME_FRAME_STATS'
+# run the game under cProfile and write the profile into the file
+PROFILE_ENV = 'MUSIC_GAME_PROFILE'
 
 class Keyset():
     """The Keyset class have different types of key sets
@@ -26,11 +43,15 @@ class DefaultSetting():
     SMALL_SCREEN_SIZE = (1250, 1050)
     MEDIUM_SCREEN_SIZE = (1800, 1400)
     LARGE_SCREEN_SIZE = (2500, 2000)
-    SLOW_VELOCITY = 16
-    MEDIUM_VELOCITY = 20
-    FAST_VELOCITY = 25
+    # velocities of circles in px per sec
+    SLOW_VELOCITY = 480
+    MEDIUM_VELOCITY = 600
+    FAST_VELOCITY = 750
 
     SCREEN_SIZES = [('Small', SMALL_SCREEN_SIZE), ('Medium', MEDIUM_SCREEN_SIZE),
                     ('Large', LARGE_SCREEN_SIZE)]
     VELOCITIES = [('Slow', SLOW_VELOCITY), ('Medium', MEDIUM_VELOCITY), ('Fast', FAST_VELOCITY)]
     MODES = [('Four keys', Keyset.FOUR_KEYS), ('Six keys', Keyset.SIX_KEYS), ('Eight keys', Keyset.EIGHT_KEYS)]
+    # the latency in ms of key presses against the music, presses are judged that much earlier
+    INPUT_OFFSETS = [('%+d ms' % offset, offset) for offset in range(-100, 101, 10)]
+    DEFAULT_INPUT_OFFSET = 0
@@ -6,11 +6,8 @@ the key.
 """
 
 import numpy as np
+from model.board import Board, DEFAULT_CIRCLE, get_boards
 
-# default value to represent a null circle
-DEFAULT_CIRCLE = -1
-# max num of circles that a track can have
-MAX_CIRCLE_NUM = 15
 # perform flags
 MISS = 'MISS'
 BAD = 'BAD'
@@ -19,45 +16,72 @@ PERFECT = 'PERFECT'
 
 class Track:
     """The Track class represent a track in the game.
-    It keeps and updates positions of all circles in the track
-    and the perform status of on this track.
+    It is a view of a lane of the board, which keeps the time that
+    circles in the track arrive at the key, where their positions are
+    derived from. The track itself keeps the perform status of on this
+    track.
     """
 
-    def __init__(self, width, height, position):
+    def __init__(self, width, height, position, board: Board = None, lane=0):
         """Track constructor.
 
         Arguments:
             width: The width of the track.
             height: The height of the track.
             position: A tuple which is the position of the track.
+            board: The board that keeps the circles, a track on its own
+                   has a board with one lane if not given.
+            lane: The lane of the track on the board.
         """
 
         self.width = width
         self.height = height
         self.position = position
         self.key_position = (self.position[0], self.position[1] + self.height)
-        # initiate an array of circles
-        self.circles = np.full((MAX_CIRCLE_NUM,), DEFAULT_CIRCLE)
+        self.board = board if board is not None else Board(1)
+        self.lane = lane
         # perform flags
         self.perform = None
-        self.count = 0
+        self.perform_time = 0
 
-    def update_circles(self, velocity):
-        """Update all existing circles
+    @property
+    def time(self):
+        """The time in ms that positions are based on."""
+        return self.board.time
+
+    @property
+    def velocity(self):
+        """The velocity of circles in px per sec."""
+        return self.board.velocity
+
+    def update_circles(self, time, velocity):
+        """Move all existing circles to where they are at the given time.
+        It moves every track on the same board.
         
         Arguments:
-            velocity: The amount to be added to circles.
+            time: The time in ms since the music started.
+            velocity: The velocity of circles in px per sec.
         """
 
-        self.circles[self.circles != DEFAULT_CIRCLE] += velocity
+        self.board.advance(time, velocity)
     
     def remove_circle(self):
         """Remove the circle at the most front."""
-        self.circles[np.argmax(self.circles)] = DEFAULT_CIRCLE
+        self.board.pop(self.lane)
+
+    def add_circle(self, arrival_time):
+        """Add one circle to the track. Circles must be added in
+        the order they arrive at the key.
+
+        Arguments:
+            arrival_time: The time in ms that the circle arrives at the key.
+        """
+
+        self.board.add(self.lane, arrival_time)
 
-    def add_circle(self):
-        """Add one circle to the track."""
-        self.circles[np.argmin(self.circles)] = 0
+    def get_arrival_times(self):
+        """Get the time in ms that circles arrive at the key in order."""
+        return self.board.get_arrival_times(self.lane)
 
     def get_circles(self):
         """Get all exsiting circles in the track.
@@ -66,8 +90,8 @@ class Track:
             An array of the tuples that are positions of the circles.
         """
 
-        return [(self.position[0], self.position[1]+height) 
-                    for height in self.circles[self.circles != DEFAULT_CIRCLE]]
+        heights = self.height - (self.get_arrival_times() - self.time) * self.velocity / 1000
+        return [(self.position[0], self.position[1]+height) for height in heights.tolist()]
 
     def get_key_position(self):
         """
@@ -84,42 +108,77 @@ class Track:
         Get the circle that is the closest to the key.
 
         Returns:
-            The value of the circle has been traveled.
+            The time in ms that the circle arrives at the key,
+            or DEFAULT_CIRCLE if there is no circle.
         """
 
-        # will return -1 when there is no circle rather than 0,
-        # but it does not matter anyway.
-        return np.max(self.circles)
+        board = self.board
+        return board.circles[self.lane, board.fronts[self.lane]]
 
     def set_miss(self):
-        """Set miss and reset count."""
+        """Set miss and reset time."""
         self.perform = MISS
-        self.count = 0
+        self.perform_time = self.time
     
     def set_bad(self):
-        """Set bad and reset count."""
+        """Set bad and reset time."""
         self.perform = BAD
-        self.count = 0
+        self.perform_time = self.time
     
     def set_good(self):
-        """Set good and reset count."""
+        """Set good and reset time."""
         self.perform = GOOD
-        self.count = 0
+        self.perform_time = self.time
     
     def set_perfect(self):
-        """Set perfect and reset count."""
+        """Set perfect and reset time."""
         self.perform = PERFECT
-        self.count = 0
+        self.perform_time = self.time
     
-    def update_perform(self, duration_count):
+    def update_perform(self, duration):
         """
-        Update perform config. Reset perform if count is over threshhold.
+        Update perform config. Reset perform if it lasts over threshhold.
 
         Arguments:
-            duration_count: The threshold to reset.
+            duration: The threshold in ms to reset.
         """
-        if self.perform:
-            self.count += 1
-            if self.count > duration_count:
-                self.perform = None
-                self.count = 0
+        if self.perform and self.time - self.perform_time > duration:
+            self.perform = None
+
+def create_tracks(width, height, positions):
+    """Create tracks that share one board.
+
+    Arguments:
+        width: The width of tracks.
+        height: The height of tracks.
+        positions: A list of tuples which are the positions of tracks.
+    Returns:
+        A dict with keys being index from 1 and values being tracks.
+    """
+
+    board = Board(len(positions))
+    return {lane + 1: Track(width, height, position, board, lane)
+            for lane, position in enumerate(positions)}
+
+def get_circle_positions(track_dict):
+    """Get the positions of the circles of all tracks at once,
+    board by board rather than track by track.
+
+    Arguments:
+        track_dict: A dict with values being tracks.
+    Returns:
+        An array of the positions of circles, a row of x and y for every circle.
+    """
+
+    positions = [np.empty((0, 2))]
+    for board in get_boards(track_dict):
+        # the x of tracks and the y of their keys by the lanes of the board
+        xs = np.zeros(board.circles.shape[0])
+        key_ys = np.zeros(board.circles.shape[0])
+        for track in track_dict.values():
+            if track.board is board:
+                xs[track.lane], key_ys[track.lane] = track.key_position
+        lanes, slots = np.nonzero(board.circles != DEFAULT_CIRCLE)
+        heights = (board.circles[lanes, slots] - board.time) * board.velocity / 1000
+        positions.append(np.stack([xs[lanes], key_ys[lanes] - heights], axis=1))
+    return np.concatenate(positions)
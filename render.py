@@ -3,87 +3,275 @@
 The render.py program renders all components to the game screen.
 """
 
+import re
 import pygame
-from model.track import Track
+from collections import OrderedDict
+from itertools import repeat
+from model.track import Track, get_circle_positions
 from model.utils import report_error
-from model.setting import IMAGE_FOLDER
+from model.assets import ASSET_CACHE
 
 # some fonts
 pygame.font.init()
 SCORE_FONT = pygame.font.SysFont('Comic Sans MS', 60)
 CENTER_FONT = pygame.font.SysFont('Comic Sans MS', 80)
 PERFORM_FONT = pygame.font.SysFont('Comic Sans MS', 30)
-styles = {'score': SCORE_FONT, 'center': CENTER_FONT, 'perform': PERFORM_FONT}
+OVERLAY_FONT = pygame.font.SysFont('Courier New', 24)
+styles = {'score': SCORE_FONT, 'center': CENTER_FONT, 'perform': PERFORM_FONT,
+          'overlay': OVERLAY_FONT}
+# the ratio of the screen area that is drawn in a frame, over which the whole screen is redrawn
+DIRTY_MAX_AREA_RATIO = 0.5
+# max num of text surfaces kept in the cache
+TEXT_CACHE_SIZE = 256
+# texts are split into single digits and runs of other characters
+TEXT_PIECE_PATTERN = re.compile(r'\d|\D+')
 
-def load_img(filename, size=None):
-    """Load an image from res/image folder.
+class DirtyRects():
+    """The DirtyRects class redraws only the regions of the screen
+    that change between frames. What is drawn in a frame is erased in
+    the next one by restoring those regions from the background, and
+    the display is updated with the regions being erased or drawn.
+    The whole screen is redrawn instead once the regions are large.
+    """
+
+    def __init__(self, screen, background, max_area_ratio=DIRTY_MAX_AREA_RATIO):
+        """DirtyRects constructor.
+
+        Arguments:
+            screen: The game screen.
+            background: The image of the size of the screen that it is
+                        restored from, e.g. the static layer.
+            max_area_ratio: The ratio of the screen area drawn in a frame
+                            over which the whole screen is redrawn, 0 to
+                            always redraw the whole screen.
+        """
+
+        self.screen = screen
+        self.background = background
+        self.max_area = screen.get_width() * screen.get_height() * max_area_ratio
+        self.last_rects = []
+        # the first frame draws the whole background
+        self.full_redraw = True
+
+    def restore(self):
+        """Erase what was drawn in the last frame."""
+        if self.full_redraw:
+            render_background(self.background, self.screen)
+        else:
+            self.screen.blits(zip(repeat(self.background), self.last_rects, self.last_rects),
+                              doreturn=False)
+
+    def update(self, rects):
+        """Update the display with the regions drawn in this frame.
+
+        Arguments:
+            rects: The rects of everything drawn in this frame.
+        """
+
+        screen_rect = self.screen.get_rect()
+        rects = [screen_rect.clip(rect) for rect in rects if rect]
+        if self.full_redraw:
+            pygame.display.update()
+        else:
+            pygame.display.update(self.last_rects + rects)
+        self.last_rects = rects
+        self.full_redraw = sum(rect.w * rect.h for rect in rects) > self.max_area
+
+def load_img(filename, size=None, alpha=False):
+    """Load an image from res/image folder. Images are cached once they
+    are loaded, thus they must be copied before being drawn on.
 
     Arguments:
         filename: The name of the file.
         size: The size of the output image, none for original size.
+        alpha: Whether the image keeps per pixel alpha.
     Returns:
         The loaded image.
     """
 
-    img = pygame.image.load(IMAGE_FOLDER+filename)
-    if size:
-        img = scale_img(img, size)
-    return img
+    return ASSET_CACHE.load(filename, size, alpha)
+
+class TextCache():
+    """The TextCache class keeps the surfaces of rendered texts, so that
+    a text is only rasterized the first time it is rendered. Digits are
+    cached as glyphs of their own, thus changing numbers such as the
+    score are composed of cached glyphs rather than rasterized again.
+    The least recently used surfaces are evicted once the cache is full.
+    """
+
+    def __init__(self, size=TEXT_CACHE_SIZE):
+        """TextCache constructor.
+
+        Arguments:
+            size: The max num of surfaces kept.
+        """
+
+        self.size = size
+        self.surfaces = OrderedDict()
+
+    def get(self, text, style, color):
+        """Get the surface of a text, rendering it if it is not cached.
+
+        Arguments:
+            text: The text.
+            style: The style of the text, one of styles.
+            color: The color of the text.
+        Returns:
+            The surface of the text.
+        """
+
+        key = (style, text, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.prepare(styles[style].render(text, False, pygame.Color(color)))
+            self.surfaces[key] = surface
+            if len(self.surfaces) > self.size:
+                self.surfaces.popitem(last=False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
+
+    def get_pieces(self, text, style, color):
+        """Get the surfaces of the pieces of a text, every digit and every
+        run of other characters being a piece.
+
+        Returns:
+            A list of surfaces to be placed side by side.
+        """
+
+        return [self.get(piece, style, color) for piece in TEXT_PIECE_PATTERN.findall(text)]
+
+    @staticmethod
+    def prepare(surface):
+        """Convert a rendered text into the pixel format of the screen with
+        a run length encoded colorkey, which is the fastest to blit.
+        """
+
+        if pygame.display.get_surface() is None:
+            return surface
+        colorkey = surface.get_colorkey()
+        surface = surface.convert()
+        surface.set_colorkey(colorkey, pygame.RLEACCEL)
+        return surface
+
+TEXT_CACHE = TextCache()
+
+def get_text_size(pieces):
+    """Get the size of the pieces of a text placed side by side."""
+    return (sum(piece.get_width() for piece in pieces),
+            max((piece.get_height() for piece in pieces), default=0))
+
+def blit_pieces(pieces, position, screen):
+    """Blit the pieces of a text side by side from a position.
+
+    Returns:
+        The rect being drawn.
+    """
+
+    x, y = position
+    for piece in pieces:
+        screen.blit(piece, (x, y))
+        x += piece.get_width()
+    return pygame.Rect(position, get_text_size(pieces))
 
-def scale_img(img, size):
-    """Rescale an image.
+def build_static_layer(background, track_dict, key_img):
+    """Compose the parts of the screen that do not change between frames,
+    the background and the keys that are not pressed, into one surface
+    in the pixel format of the screen, so that it is blitted without
+    being converted.
 
     Arguments:
-        img: The image to be rescaled.
-        size: The size of the image to scale.
+        background: The background image of the size of the screen.
+        track_dict: A dict with values being tracks.
+        key_img: The image of the keys that are not pressed.
     Returns:
-        The rescaled image.
+        The surface of the static layer.
     """
 
-    if img.get_size() == size:
-        return img
-    return pygame.transform.scale(img, size)
+    static_layer = background.convert()
+    for track in track_dict.values():
+        static_layer.blit(key_img, track.key_position)
+    return static_layer
 
 def render_background(background, screen):
     """Render the background."""
     screen.blit(background, (0,0))
 
+def render_key(track: Track, key_img, screen):
+    """Render the key of a track and its perform if any.
+
+    Arguments:
+        track: The track that has the key.
+        key_img: The image of the key, None if the key is on the static layer.
+        screen: The game screen that the key will be rendered on.
+    Returns:
+        A list of the rects being drawn.
+    """
+
+    # render key
+    rects = [screen.blit(key_img, track.key_position)] if key_img else []
+    # render perform if any
+    perform = track.perform
+    if perform:
+        rects.append(render_text(perform, track.key_position, screen, style='perform', color='white'))
+    return rects
+
+def render_circles(track_dict, circle_img, screen):
+    """Render the circles of all tracks with a single blits call,
+    where positions come from the boards of tracks all at once.
+
+    Arguments:
+        track_dict: A dict with values being tracks.
+        circle_img: The image of the circles.
+        screen: The game screen that the circles will be rendered on.
+    Returns:
+        A list of the rects being drawn.
+    """
+
+    # the rows of the array are passed as they are, without a list of positions
+    return screen.blits(zip(repeat(circle_img), get_circle_positions(track_dict)))
+
 def render_track(track: Track, key_img, circle_img, screen):
     """Render the tracks. A track has its key and circles.
 
     Arguments:
         track: The track that has key and circles.
-        key_img: The image of the key.
+        key_img: The image of the key, None if the key is on the static layer.
         circle_img: The image of the circles.
         screen: The game screen that the track will be rendered on.
+    Returns:
+        A list of the rects being drawn.
     """
 
-    # render key
-    screen.blit(key_img, track.key_position)
-    # render perform if any
-    perform = track.perform
-    if perform:
-        render_text(perform, track.key_position, screen, style='perform', color='white')
+    rects = render_key(track, key_img, screen)
     # render circles
     for circle_position in track.get_circles():
-        screen.blit(circle_img, circle_position)
+        rects.append(screen.blit(circle_img, circle_position))
+    return rects
 
 def render_all_tracks(track_dict, key_imgs, circle_img, screen):
-    """Render all tracks. Each track has its key and circles.
+    """Render all tracks. Each track has its key and circles, and
+    the circles of all tracks are rendered at once after the keys.
 
     Arguments:
         track_dict: A dict with keys being index and values being tracks.
-        key_imgs: The list of images of the key. The order should match track_dict.
+        key_imgs: The list of images of the key, None for keys on the static layer.
+                  The order should match track_dict.
         circle_img: The image of the circles.
         screen: The game screen that the track will be rendered on.
+    Returns:
+        A list of the rects being drawn.
     """
 
     # validate arguments
     if len(track_dict) != len(key_imgs):
         report_error('Keys and key_imgs do not match')
 
+    rects = []
     for track, key_img in zip(track_dict.values(), key_imgs):
-        render_track(track, key_img, circle_img, screen)
+        rects.extend(render_key(track, key_img, screen))
+    rects.extend(render_circles(track_dict, circle_img, screen))
+    return rects
 
 def render_text(text, position, screen, style, color='black'):
     """Render text to the screen.
@@ -94,14 +282,15 @@ def render_text(text, position, screen, style, color='black'):
         screen: The game screen that the track will be rendered on.
         style: The style of the text, 'score', 'combo', or 'perform'.
         color: The color of the text.
+    Returns:
+        The rect being drawn.
     """
 
     # validate arguments
     if style not in styles:
         report_error('No such text style')
 
-    textsurface = styles[style].render(text, False, pygame.Color(color))
-    screen.blit(textsurface, position)
+    return blit_pieces(TEXT_CACHE.get_pieces(text, style, color), position, screen)
 
 def render_text_center(text, screen, style, color='black'):
     """Render text to the center of the screen.
@@ -111,17 +300,44 @@ def render_text_center(text, screen, style, color='black'):
         screen: The game screen that the track will be rendered on.
         style: The style of the text, 'score', 'combo', or 'perform'.
         color: The color of the text.
+    Returns:
+        The rect being drawn.
     """
 
     # validate arguments
     if style not in styles:
         report_error('No such text style')
     
-    textsurface = styles[style].render(text, False, pygame.Color(color))
-    position = textsurface.get_rect(center=(screen.get_width()/2, screen.get_height()/2))
-    screen.blit(textsurface, position)
+    pieces = TEXT_CACHE.get_pieces(text, style, color)
+    position = pygame.Rect((0, 0), get_text_size(pieces))
+    position.center = (screen.get_width()/2, screen.get_height()/2)
+    return blit_pieces(pieces, position.topleft, screen)
+
+def render_overlay(lines, position, screen):
+    """Render lines of text on a dark box, e.g. the frame times.
+
+    Arguments:
+        lines: The lines of text.
+        position: The position of the top left corner of the box.
+        screen: The game screen that the text will be rendered on.
+    Returns:
+        The rect being drawn, None if there is no line.
+    """
+
+    lines = [TEXT_CACHE.get_pieces(line, 'overlay', 'white') for line in lines]
+    if not lines:
+        return None
+    sizes = [get_text_size(pieces) for pieces in lines]
+    width = max(size[0] for size in sizes)
+    height = sum(size[1] for size in sizes)
+    rect = screen.fill(pygame.Color('black'), pygame.Rect(position, (width, height)))
+    x, y = position
+    for pieces, size in zip(lines, sizes):
+        blit_pieces(pieces, (x, y), screen)
+        y += size[1]
+    return rect
 
 def display_score(score, position, screen):
-    """Render the score."""
-    render_text('Score:%d' % score, position, screen, 'score', 'white')
+    """Render the score, returns the rect being drawn."""
+    return render_text('Score:%d' % score, position, screen, 'score', 'white')
 
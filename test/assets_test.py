@@ -0,0 +1,66 @@
+import unittest
+import os, sys
+import tempfile
+import pygame
+path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if path not in sys.path:
+    sys.path.append(path)
+from model.assets import AssetCache
+
+IMAGE_SIZE = (40, 30)
+SCALED_SIZE = (20, 10)
+
+class AssetCacheTest(unittest.TestCase):
+    def setUp(self):
+        # set up an image in a temporary folder
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        pygame.display.init()
+        pygame.display.set_mode((100, 100))
+        self.folder = tempfile.TemporaryDirectory()
+        self.disk_folder = os.path.join(self.folder.name, 'assets')
+        image = pygame.Surface(IMAGE_SIZE)
+        image.fill((200, 100, 50))
+        pygame.image.save(image, os.path.join(self.folder.name, 'image.png'))
+
+    def tearDown(self):
+        self.folder.cleanup()
+        pygame.display.quit()
+
+    def test_memory(self):
+        # test an image is decoded once for every size
+        cache = AssetCache(self.folder.name, disk_folder=None)
+        image = cache.load('image.png', SCALED_SIZE)
+        self.assertEqual(image.get_size(), SCALED_SIZE)
+        self.assertIs(cache.load('image.png', SCALED_SIZE), image)
+        self.assertEqual(cache.load('image.png').get_size(), IMAGE_SIZE)
+        self.assertEqual(cache.decoded, 2)
+
+    def test_eviction(self):
+        # test the least recently used image is evicted
+        cache = AssetCache(self.folder.name, size_limit=SCALED_SIZE[0] * SCALED_SIZE[1] * 4,
+                           disk_folder=None)
+        cache.load('image.png', SCALED_SIZE)
+        cache.load('image.png', (10, 10))
+        self.assertEqual(list(cache.images), [('image.png', (10, 10), False)])
+
+    def test_disk(self):
+        # test a scaled image is read from disk by another cache without being decoded
+        AssetCache(self.folder.name, disk_folder=self.disk_folder).load('image.png', SCALED_SIZE, True)
+        cache = AssetCache(self.folder.name, disk_folder=self.disk_folder)
+        image = cache.load('image.png', SCALED_SIZE, True)
+        self.assertEqual(cache.decoded, 0)
+        self.assertEqual(image.get_at((0, 0)), (200, 100, 50, 255))
+
+    def test_disk_eviction(self):
+        # test the least recently used image on disk is evicted over the size limit
+        cache = AssetCache(self.folder.name, disk_folder=self.disk_folder,
+                           disk_size_limit=SCALED_SIZE[0] * SCALED_SIZE[1] * 3)
+        cache.load('image.png', SCALED_SIZE)
+        first = cache.get_disk_entry('image.png', SCALED_SIZE, False)
+        os.utime(first, (0, 0))
+        cache.load('image.png', (10, 10))
+        self.assertFalse(os.path.exists(first))
+        self.assertTrue(os.path.exists(cache.get_disk_entry('image.png', (10, 10), False)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import os, sys
+path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if path not in sys.path:
+    sys.path.append(path)
+from model.board import Board, DEFAULT_CIRCLE
+
+LANE_NUM = 4
+CAPACITY = 4
+
+class BoardTest(unittest.TestCase):
+    def test_front(self):
+        # test the front circle of every lane is found at once
+        board = Board(LANE_NUM, CAPACITY)
+        board.add(0, 100)
+        board.add(0, 200)
+        board.add(2, 150)
+        self.assertEqual(list(board.front()), [100, DEFAULT_CIRCLE, 150, DEFAULT_CIRCLE])
+
+    def test_grow(self):
+        # test lanes keep their circles in order when the board grows
+        board = Board(LANE_NUM, CAPACITY)
+        for time in range(3):
+            board.add(1, time)
+        board.pop(1)
+        for time in range(3, 10):
+            board.add(1, time)
+            board.add(3, time)
+        self.assertEqual(list(board.get_arrival_times(1)), list(range(1, 10)))
+        self.assertEqual(list(board.get_arrival_times(3)), list(range(3, 10)))
+        self.assertEqual(list(board.front()), [DEFAULT_CIRCLE, 1, DEFAULT_CIRCLE, 3])
+
+    def test_expire(self):
+        # test circles before the limit are removed from all lanes at once
+        board = Board(LANE_NUM, CAPACITY)
+        for time in range(0, 700, 100):
+            board.add(time // 100 % LANE_NUM, time)
+        expired = board.expire(350)
+        self.assertEqual(list(expired), [1, 1, 1, 1])
+        self.assertEqual(list(board.front()), [400, 500, 600, DEFAULT_CIRCLE])
+        self.assertEqual(list(board.counts), [1, 1, 1, 0])
+        self.assertFalse(board.expire(350).any())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import os, sys
+import tempfile
+import numpy as np
+path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if path not in sys.path:
+    sys.path.append(path)
+from model.cache import AnalysisCache, open_atomic
+
+PARAMETERS = {'hop_length': 4096}
+
+def write_file(filename, content):
+    with open(filename, 'wb') as file:
+        file.write(content)
+
+class AnalysisCacheTest(unittest.TestCase):
+    def setUp(self):
+        # set up a cache and a music file in a temporary folder
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache = AnalysisCache(os.path.join(self.folder.name, 'cache'))
+        self.music = os.path.join(self.folder.name, 'music.mp3')
+        write_file(self.music, b'music')
+        self.calls = 0
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def analyze(self):
+        self.calls += 1
+        return {'beats': np.arange(5, dtype=float), 'seg_length': 0.5}
+
+    def test_fetch_analyzes_once(self):
+        # test the analysis only runs when the entry is missing
+        self.cache.fetch(self.music, 'beats', PARAMETERS, self.analyze)
+        result = self.cache.fetch(self.music, 'beats', PARAMETERS, self.analyze)
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(np.array_equal(result['beats'], np.arange(5)))
+        self.assertEqual(float(result['seg_length']), 0.5)
+
+    def test_parameter_change_invalidates(self):
+        # test entries are not shared between different parameters
+        self.cache.fetch(self.music, 'beats', PARAMETERS, self.analyze)
+        self.cache.fetch(self.music, 'beats', {'hop_length': 512}, self.analyze)
+        self.assertEqual(self.calls, 2)
+
+    def test_file_change_invalidates(self):
+        # test entries are not shared between different file contents
+        self.cache.fetch(self.music, 'beats', PARAMETERS, self.analyze)
+        write_file(self.music, b'another music')
+        os.utime(self.music, ns=(0, 0))
+        self.cache.fetch(self.music, 'beats', PARAMETERS, self.analyze)
+        self.assertEqual(self.calls, 2)
+
+    def test_eviction(self):
+        # test the least recently used entry is evicted over the size limit
+        self.cache.save(self.music, 'first', PARAMETERS, self.analyze())
+        entry_size = os.path.getsize(self.cache.get_entry(self.music, 'first', PARAMETERS))
+        self.cache.size_limit = 2 * entry_size
+        first = self.cache.get_entry(self.music, 'first', PARAMETERS)
+        os.utime(first, (0, 0))
+        self.cache.save(self.music, 'second', PARAMETERS, self.analyze())
+        os.utime(self.cache.get_entry(self.music, 'second', PARAMETERS), (1, 1))
+        self.cache.save(self.music, 'third', PARAMETERS, self.analyze())
+        self.assertFalse(os.path.exists(first))
+        self.assertIsNotNone(self.cache.load(self.music, 'second', PARAMETERS))
+        self.assertIsNotNone(self.cache.load(self.music, 'third', PARAMETERS))
+
+    def test_stale_temp_entries(self):
+        # test entries left half written by a killed writer are removed, but not those being written
+        self.cache.save(self.music, 'first', PARAMETERS, self.analyze())
+        entry = self.cache.get_entry(self.music, 'first', PARAMETERS)
+        stale = entry + '.1.tmp'
+        writing = entry + '.2.tmp'
+        write_file(stale, b'partial')
+        write_file(writing, b'partial')
+        os.utime(stale, (0, 0))
+        self.cache.evict()
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(writing))
+        self.assertTrue(os.path.exists(entry))
+
+    def test_open_atomic(self):
+        # test a file is only replaced once it is complete, and a failed write leaves nothing behind
+        with open_atomic(self.music) as file:
+            file.write(b'new music')
+        with self.assertRaises(ValueError):
+            with open_atomic(self.music) as file:
+                file.write(b'partial')
+                raise ValueError
+        with open(self.music, 'rb') as file:
+            self.assertEqual(file.read(), b'new music')
+        self.assertEqual(os.listdir(self.folder.name), ['music.mp3'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import os, sys
+import random
+import tempfile
+import numpy as np
+path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if path not in sys.path:
+    sys.path.append(path)
+from model.setting import Keyset
+from model.chart import Chart, compile_chart, generate_stress_chart, get_mask, get_track_indexes
+from model.pattern_library import PatternLibrary
+
+BEAT_NUM = 200
+
+class ChartTest(unittest.TestCase):
+    def setUp(self):
+        # set up a chart file in a temporary folder
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, 'music.6k.chart')
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_mask(self):
+        # test track indexes are converted into bitmasks and back
+        self.assertEqual(get_mask((1, 3, 8)), 0b10000101)
+        self.assertEqual(get_track_indexes(0b10000101), [1, 3, 8])
+        self.assertEqual(get_track_indexes(0), [])
+
+    def test_save_load(self):
+        # test a chart is the same after saved and loaded
+        times = np.arange(BEAT_NUM) * 250
+        masks = np.arange(BEAT_NUM) % 64
+        Chart(times, masks, 6).save(self.path)
+        chart = Chart.load(self.path)
+        self.assertEqual(chart.key_num, 6)
+        self.assertTrue(np.array_equal(chart.times, times))
+        self.assertTrue(np.array_equal(chart.masks, masks))
+        self.assertTrue(Chart.is_valid(self.path))
+
+    def test_load_invalid(self):
+        # test loading a file that is not a chart fails
+        with open(self.path, 'wb') as file:
+            file.write(b'not a chart file')
+        self.assertRaises(ValueError, Chart.load, self.path)
+        self.assertFalse(Chart.is_valid(self.path))
+
+    def test_load_truncated(self):
+        # test loading a truncated chart fails
+        Chart(np.arange(BEAT_NUM), np.ones(BEAT_NUM), 4).save(self.path)
+        with open(self.path, 'r+b') as file:
+            file.truncate(os.path.getsize(self.path) - 1)
+        self.assertRaises(ValueError, Chart.load, self.path)
+
+    def test_compile(self):
+        # test every beat of a compiled chart is in the keyset
+        beats = list(np.arange(BEAT_NUM) * 300.4)
+        patterns = list(np.arange(BEAT_NUM) // 20 % 3)
+        chart = compile_chart(beats, patterns, Keyset.FOUR_KEYS)
+        self.assertEqual(chart.key_num, 4)
+        self.assertTrue(np.array_equal(chart.times, np.round(beats)))
+        self.assertTrue((chart.masks < 1 << 4).all())
+
+    def test_compile_same_as_library(self):
+        # test tracks are the same as the ones that the pattern library gives beat by beat
+        rng = np.random.default_rng(0)
+        for seed in range(5):
+            patterns = np.repeat(rng.integers(0, 5, BEAT_NUM), rng.integers(1, 20, BEAT_NUM))[:BEAT_NUM]
+            random.seed(seed)
+            pattern_library = PatternLibrary(patterns.max(), Keyset.EIGHT_KEYS)
+            wanted = [get_mask(pattern_library.get_track_index(pattern)) for pattern in patterns]
+            random.seed(seed)
+            chart = compile_chart(np.arange(BEAT_NUM), patterns, Keyset.EIGHT_KEYS)
+            self.assertEqual(list(chart.masks), wanted)
+
+    def test_stress_chart(self):
+        # test every beat of a stress chart has as many different tracks as the chord
+        chart = generate_stress_chart(10, 6, 100, chord_size=3)
+        self.assertEqual(chart.times.shape[0], 1000)
+        self.assertEqual(chart.times[1], 10)
+        self.assertTrue(all(len(get_track_indexes(mask)) == 3 for mask in chart.masks.tolist()))
+        self.assertTrue((chart.masks < 1 << 6).all())
+
+if __name__ == '__main__':
+    unittest.main()
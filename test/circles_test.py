@@ -0,0 +1,82 @@
+import unittest
+import os, sys
+import numpy as np
+import pygame
+path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if path not in sys.path:
+    sys.path.append(path)
+from model.chart import Chart
+from model.circles import CircleHandler
+from model.autoplay import Autoplay
+from model.setting import Keyset
+from utils import get_track_dict
+
+TRACK_NUM = 4
+# circles take 1 sec to reach the keys
+TIME_DELAY = 1
+
+def create_handler(times):
+    masks = [1 << (index % TRACK_NUM) for index in range(len(times))]
+    chart = Chart(times, masks, TRACK_NUM)
+    return CircleHandler(chart, TIME_DELAY)
+
+def count_circles(track_dict):
+    return sum(len(track.get_arrival_times()) for track in track_dict.values())
+
+class CircleHandlerTest(unittest.TestCase):
+    def test_skip_starting_part(self):
+        # test beats that cannot travel the whole track are skipped
+        handler = create_handler([500, 1000, 1500, 2000])
+        self.assertEqual(handler.cursor, 2)
+
+    def test_catch_up(self):
+        # test all beats that are due are spawned in one update
+        tracks = get_track_dict(TRACK_NUM)
+        handler = create_handler(np.arange(1100, 2000, 10))
+        handler.update_circles(0, 1000, tracks)
+        self.assertEqual(count_circles(tracks), 0)
+        handler.update_circles(500, 1000, tracks)
+        self.assertEqual(count_circles(tracks), 40)
+        handler.update_circles(500, 1000, tracks)
+        self.assertEqual(count_circles(tracks), 40)
+
+    def test_late_circles(self):
+        # test circles that spawn late are placed by how late they are
+        tracks = get_track_dict(TRACK_NUM)
+        handler = create_handler([1500, 1600])
+        handler.update_circles(700, 1000, tracks)
+        self.assertEqual(tracks[1].get_circles(), [(0, 1000 - 800)])
+        self.assertEqual(tracks[2].get_circles(), [(5, 1000 - 900)])
+
+    def test_seek(self):
+        # test seeking places the cursor after the given time
+        tracks = get_track_dict(TRACK_NUM)
+        handler = create_handler(np.arange(1000, 10000, 1000))
+        handler.seek(5000)
+        handler.update_circles(5001, 1000, tracks)
+        self.assertEqual([list(track.get_arrival_times()) for track in tracks.values()],
+                         [[], [6000], [], []])
+
+class AutoplayTest(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        pygame.display.init()
+        pygame.event.clear()
+
+    def tearDown(self):
+        pygame.display.quit()
+
+    def test_press_arrived(self):
+        # test the keys of arrived beats are pressed once, skipping the starting part
+        chart = Chart([500, 1500, 2000, 2000, 3000], [1, 2, 4, 8, 1], TRACK_NUM)
+        autoplay = Autoplay(chart, Keyset.FOUR_KEYS, TIME_DELAY)
+        autoplay.press(600)
+        self.assertEqual(pygame.event.get(pygame.KEYDOWN), [])
+        autoplay.press(2000)
+        autoplay.press(2500)
+        events = pygame.event.get(pygame.KEYDOWN)
+        self.assertEqual([Keyset.FOUR_KEYS[event.key] for event in events], [2, 3, 4])
+        self.assertTrue(all(event.autoplay for event in events))
+
+if __name__ == '__main__':
+    unittest.main()
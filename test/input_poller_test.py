@@ -0,0 +1,63 @@
+import unittest
+import os, sys
+import time
+import pygame
+path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if path not in sys.path:
+    sys.path.append(path)
+from model.clock import SimulatedClock
+from model.input_poller import InputPoller
+
+FRAME_RATE = 50
+
+class InputPollerTest(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        pygame.display.init()
+        pygame.event.clear()
+        self.clock = SimulatedClock(10, 1000)
+        self.clock.start()
+
+    def tearDown(self):
+        pygame.display.quit()
+
+    def test_stamp_presses(self):
+        # test presses are stamped when read, unless they carry their own time
+        poller = InputPoller(self.clock, FRAME_RATE)
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_s))
+        poller.poll()
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_d, time=500))
+        pygame.event.post(pygame.event.Event(pygame.KEYUP, key=pygame.K_s))
+        events = poller.get()
+        self.assertEqual([event.type for event in events],
+                         [pygame.KEYDOWN, pygame.KEYDOWN, pygame.KEYUP])
+        self.assertEqual([event.time for event in events[:2]], [0, 500])
+        self.assertEqual(poller.get(), [])
+
+    def test_press_during_frame(self):
+        # test a press polled while a frame renders keeps the time it is read at
+        poller = InputPoller(self.clock, 0)
+        poller.wait()
+        frame_time = self.clock.now()
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_s))
+        poller.poll()
+        # rendering goes on while the music time moves
+        for _ in range(5):
+            self.clock.now()
+        events = poller.get()
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].time, frame_time + 1)
+        self.assertLess(events[0].time, self.clock.now())
+
+    def test_wait(self):
+        # test waiting lasts until the next frame is due and keeps polling
+        poller = InputPoller(self.clock, FRAME_RATE)
+        poller.wait()
+        start = time.perf_counter()
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_s))
+        poller.wait()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.9 / FRAME_RATE)
+        self.assertEqual(len(poller.events), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,59 +4,99 @@ path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if path not in sys.path:
     sys.path.append(path)
 from model.track import Track
-from model.score_circles import (calculate_accuracy, score_miss,
-    MISS, MISS_SCORE)
+import pygame
+from model.setting import Keyset
+from model.score_circles import (calculate_accuracy, get_press_time, score_miss, score_press,
+    MISS, MISS_SCORE, PERFECT, PERFECT_SCORE, GOOD, GOOD_SCORE, BAD, BAD_SCORE)
 from utils import add_update_circle, get_track_dict
 
-FRAME_RATE = 10
-VELOCITY = 1
 TRACK_NUM = 6
+ARRIVAL_TIME = 1000
 
-def create_and_update_tracks(update_velocity):
+def create_and_update_tracks(time):
     tracks = get_track_dict(TRACK_NUM)
-    update = tracks[1].height + int(update_velocity * FRAME_RATE)
-    add_update_circle(tracks[1], update)
+    add_update_circle(tracks[1], ARRIVAL_TIME, time)
     return tracks
 
 class AccuracyTest(unittest.TestCase):
     def test_accuracy(self):
         # test calc_accuracy return correct accuracy
         HEIGHT = 1000
-        UPDATE = 800
+        TIME = 800
         track = Track(0,HEIGHT,(0,0))
-        add_update_circle(track, UPDATE)
-        accuracy = calculate_accuracy(track, FRAME_RATE, VELOCITY)
-        self.assertEqual(accuracy, (HEIGHT-UPDATE) / FRAME_RATE / VELOCITY)
+        add_update_circle(track, ARRIVAL_TIME, TIME)
+        accuracy = calculate_accuracy(track, TIME)
+        self.assertEqual(accuracy, ARRIVAL_TIME - TIME)
 
     def test_accuracy_pass_over(self):
         # test calc_accuracy return correct accuracy
         # when the circle passes over the key
         HEIGHT = 1000
-        UPDATE = 1200
+        TIME = 1200
         track = Track(0,HEIGHT,(0,0))
-        add_update_circle(track, UPDATE)
-        accuracy = calculate_accuracy(track, FRAME_RATE, VELOCITY)
-        self.assertEqual(accuracy, (HEIGHT-UPDATE) / FRAME_RATE / VELOCITY)
+        add_update_circle(track, ARRIVAL_TIME, TIME)
+        accuracy = calculate_accuracy(track, TIME)
+        self.assertEqual(accuracy, ARRIVAL_TIME - TIME)
 
 class PerformanceMissTest(unittest.TestCase):
     def test_miss(self):
         # test miss is detected
-        tracks = create_and_update_tracks(1 - MISS)
-        score = score_miss(tracks, FRAME_RATE, VELOCITY)
+        time = ARRIVAL_TIME - MISS + 1
+        tracks = create_and_update_tracks(time)
+        score = score_miss(tracks, time)
         self.assertEqual(score, MISS_SCORE)
 
     def test_remove_miss_circle(self):
         # test miss circle is removed
-        tracks = create_and_update_tracks(1 - MISS)
-        score_miss(tracks, FRAME_RATE, VELOCITY)
+        time = ARRIVAL_TIME - MISS + 1
+        tracks = create_and_update_tracks(time)
+        score_miss(tracks, time)
         circles = tracks[1].get_circles()
         self.assertEqual(len(circles), 0)
 
+    def test_miss_several(self):
+        # test all circles missed during a lag are removed at once
+        tracks = get_track_dict(TRACK_NUM)
+        for index in range(5):
+            add_update_circle(tracks[1], ARRIVAL_TIME + index * 100)
+        time = ARRIVAL_TIME + 300 - MISS + 1
+        score = score_miss(tracks, time)
+        self.assertEqual(score, 4 * MISS_SCORE)
+        self.assertEqual(tracks[1].get_front_circle(), ARRIVAL_TIME + 400)
+
     def test_no_miss(self):
         # test detection on no miss
-        tracks = create_and_update_tracks(0)
-        score = score_miss(tracks, FRAME_RATE, VELOCITY)
+        tracks = create_and_update_tracks(ARRIVAL_TIME)
+        score = score_miss(tracks, ARRIVAL_TIME)
         self.assertEqual(score, 0)    
 
+class PerformancePressTest(unittest.TestCase):
+    def test_press(self):
+        # test presses are rated by how far they are from the arrival time
+        for offset, wanted in ((PERFECT - 1, PERFECT_SCORE), (-GOOD + 1, GOOD_SCORE),
+                               (BAD - 1, BAD_SCORE), (BAD + 1, 0)):
+            tracks = create_and_update_tracks(ARRIVAL_TIME + offset)
+            event = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_s)
+            score = score_press(event, tracks, Keyset.SIX_KEYS, ARRIVAL_TIME + offset)
+            self.assertEqual(score, wanted)
+
+    def test_stamped_press(self):
+        # test presses stamped on arrival are judged by their time and the input offset
+        tracks = create_and_update_tracks(ARRIVAL_TIME + BAD - 1)
+        event = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_s, time=ARRIVAL_TIME + 30)
+        press_time = get_press_time(event, ARRIVAL_TIME + BAD - 1, input_offset=30)
+        self.assertEqual(press_time, ARRIVAL_TIME)
+        self.assertEqual(score_press(event, tracks, Keyset.SIX_KEYS, press_time), PERFECT_SCORE)
+        event = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_s)
+        self.assertEqual(get_press_time(event, ARRIVAL_TIME, input_offset=-10), ARRIVAL_TIME + 10)
+
+    def test_autoplay_press(self):
+        # test autoplay presses are judged by their arrival time whatever the input offset is
+        tracks = create_and_update_tracks(ARRIVAL_TIME + BAD - 1)
+        event = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_s, time=ARRIVAL_TIME, autoplay=True)
+        press_time = get_press_time(event, ARRIVAL_TIME + BAD - 1, input_offset=60)
+        self.assertEqual(press_time, ARRIVAL_TIME)
+        self.assertEqual(score_press(event, tracks, Keyset.SIX_KEYS, press_time), PERFECT_SCORE)
+
 if __name__ == '__main__':
     unittest.main()
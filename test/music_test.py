@@ -0,0 +1,136 @@
+import unittest
+import os, sys
+import tempfile
+import numpy as np
+import soundfile
+from scipy import sparse
+path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if path not in sys.path:
+    sys.path.append(path)
+from model.music import label_repetition, get_diagonal_runs, banded_recurrence_matrix
+from model.music import Song, MusicAnalyzer, analyze_stream, retrieve_beats
+from model.music import get_frequency_bands, get_band_weights
+from benchmark.repetition import label_repetition_loop, synthetic_recurrence
+
+MIN_REPETITION = 16
+SIZE = 400
+
+class DiagonalRunTest(unittest.TestCase):
+    def test_runs(self):
+        # test runs are found along diagonals above the min offset
+        R = np.zeros((10, 10), dtype=bool)
+        R[[1,2,3], [6,7,8]] = True
+        R[[5,6], [7,8]] = True
+        R[[0,1], [1,2]] = True
+        starts, offsets, lengths = get_diagonal_runs(R, 2)
+        self.assertEqual(list(starts), [5, 1])
+        self.assertEqual(list(offsets), [2, 5])
+        self.assertEqual(list(lengths), [2, 3])
+
+class LabelRepetitionTest(unittest.TestCase):
+    def assert_same_labels(self, R, min_repetition=MIN_REPETITION):
+        wanted = label_repetition_loop(R, min_repetition)
+        self.assertTrue(np.array_equal(label_repetition(R, min_repetition), wanted))
+
+    def test_no_repetition(self):
+        # test nothing is labeled without correlation
+        R = np.zeros((SIZE, SIZE), dtype=bool)
+        self.assertFalse(label_repetition(R, MIN_REPETITION).any())
+
+    def test_same_as_loop(self):
+        # test labels match the original loop on random songs
+        for seed in range(5):
+            self.assert_same_labels(synthetic_recurrence(SIZE, seed=seed))
+
+    def test_same_as_loop_short_sections(self):
+        # test labels match the original loop when sections barely repeat
+        for seed in range(5):
+            self.assert_same_labels(synthetic_recurrence(SIZE, MIN_REPETITION, seed=seed))
+
+    def test_same_as_loop_dense(self):
+        # test labels match the original loop on dense noise
+        rng = np.random.default_rng(0)
+        R = rng.random((SIZE // 4, SIZE // 4)) < 0.8
+        self.assert_same_labels(R | R.T, 3)
+
+    def test_sparse_same_as_dense(self):
+        # test labels are the same on a sparse matrix
+        for seed in range(3):
+            R = synthetic_recurrence(SIZE, seed=seed)
+            self.assertTrue(np.array_equal(label_repetition(sparse.csr_matrix(np.triu(R)), MIN_REPETITION),
+                                           label_repetition(R, MIN_REPETITION)))
+
+class BandedRecurrenceTest(unittest.TestCase):
+    def test_mutual_neighbors(self):
+        # test links are mutual nearest neighbors outside the band
+        SEGMENTS, WIDTH, K = 120, 10, 6
+        features = np.random.default_rng(0).random((12, SEGMENTS))
+        R = banded_recurrence_matrix(features, WIDTH, K).toarray()
+
+        points = features.T
+        distances = ((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=-1)
+        index = np.arange(SEGMENTS)
+        distances[np.abs(index[:, None] - index[None, :]) < WIDTH] = np.inf
+        neighbors = np.zeros((SEGMENTS, SEGMENTS), dtype=bool)
+        neighbors[index[:, None], np.argsort(distances, axis=1)[:, :K]] = True
+        self.assertTrue(np.array_equal(R, np.triu(neighbors & neighbors.T, WIDTH)))
+
+    def test_repeated_features(self):
+        # test repeated features are labeled as repetition
+        section = np.random.default_rng(0).random((12, 40))
+        features = np.concatenate([section, section + 0.01, section - 0.01], axis=1)
+        repetition = label_repetition(banded_recurrence_matrix(features, 10), 8)
+        self.assertTrue(repetition.all())
+
+class StreamTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # a tone with a click every half second
+        cls.folder = tempfile.TemporaryDirectory()
+        sample_rate = 44100
+        time = np.arange(20 * sample_rate) / sample_rate
+        music = 0.1 * np.sin(2 * np.pi * 220 * time)
+        noise = np.random.default_rng(0).standard_normal(800) * np.exp(-np.arange(800) / 100)
+        for click in range(sample_rate // 4, music.shape[0] - 800, sample_rate // 2):
+            music[click:click+800] += noise
+        soundfile.write(os.path.join(cls.folder.name, 'music.wav'), music, sample_rate)
+        cls.song = Song('music.wav', cls.folder.name)
+        cls.beats, cls.bands = analyze_stream(cls.song)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.folder.cleanup()
+
+    def test_short_song_not_streamed(self):
+        self.assertFalse(self.song.streaming)
+
+    def test_same_beats(self):
+        # test beats are the same as the ones of the decoded music
+        beats = retrieve_beats(*self.song.load())
+        self.assertEqual(len(self.beats['beats']), len(beats))
+        self.assertTrue(np.allclose(self.beats['beats'], beats, atol=0.03))
+
+    def test_same_bands(self):
+        # test the band table matches the one of the decoded music
+        analysis = MusicAnalyzer.analyze(self.song)
+        table = analysis['band_table'].astype(np.float32)
+        ratio = float(analysis['time_index_ratio'])
+        stream_table = self.bands['band_table'].astype(np.float32)
+        stream_ratio = float(self.bands['time_index_ratio'])
+        self.assertEqual(stream_table.shape[1], table.shape[1])
+        for time in np.linspace(1, 18, 35):
+            self.assertTrue(np.allclose(stream_table[int(time*stream_ratio)],
+                                        table[int(time*ratio)], atol=1))
+
+class BandWeightTest(unittest.TestCase):
+    def test_same_as_loop(self):
+        # test weights average the bins of every frequency in a band
+        spectrogram = np.random.default_rng(0).random((1000, 5))
+        bands = [band for group in get_frequency_bands() for band in group]
+        weights = get_band_weights(bands, 0.15, spectrogram.shape[0])
+        for index, band in enumerate(bands):
+            wanted = np.mean([spectrogram[int(freq * 0.15)] for freq in band], axis=0)
+            self.assertTrue(np.allclose((weights @ spectrogram)[index], wanted))
+
+if __name__ == '__main__':
+    unittest.main()
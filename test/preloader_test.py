@@ -0,0 +1,73 @@
+import unittest
+import os, sys
+import time
+import tempfile
+import numpy as np
+import soundfile
+path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if path not in sys.path:
+    sys.path.append(path)
+from model.cache import AnalysisCache
+from model.music import BEATS_PARAMETERS, BANDS_PARAMETERS
+from model.preloader import AnalysisPreloader
+
+MUSIC_FILES = ['first.wav', 'second.wav', 'third.wav']
+SAMPLE_RATE = 22050
+# the length in sec of the songs, the shortest that every analysis runs on
+DURATION = 6
+
+def write_song(filename, frequency):
+    # a tone with a click at every half a sec
+    sample_time = np.arange(DURATION * SAMPLE_RATE) / SAMPLE_RATE
+    samples = 0.3 * np.sin(2 * np.pi * frequency * sample_time)
+    samples[(sample_time % 0.5) < 0.01] += 0.6
+    soundfile.write(filename, samples.astype(np.float32), SAMPLE_RATE)
+
+def wait_until(condition, timeout=60):
+    end = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > end:
+            raise TimeoutError
+        time.sleep(0.01)
+
+class AnalysisPreloaderTest(unittest.TestCase):
+    def setUp(self):
+        # set up songs and a cache in a temporary folder
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache_folder = os.path.join(self.folder.name, 'cache')
+        for index, filename in enumerate(MUSIC_FILES):
+            write_song(os.path.join(self.folder.name, filename), 220 * (index + 1))
+        self.preloader = AnalysisPreloader(MUSIC_FILES, 1, self.folder.name, self.cache_folder)
+
+    def tearDown(self):
+        self.preloader.close()
+        self.folder.cleanup()
+
+    def test_prioritize(self):
+        # test a prioritized file is analyzed before the other pending files
+        wait_until(lambda: 'first.wav' in self.preloader.results)
+        self.preloader.prioritize('third.wav')
+        self.assertEqual(self.preloader.pending, ['third.wav', 'second.wav'])
+        # the files are submitted by the preloader itself, in the order they are pending
+        wait_until(lambda: len(self.preloader.results) == len(MUSIC_FILES))
+        self.assertEqual(list(self.preloader.results), ['first.wav', 'third.wav', 'second.wav'])
+
+    def test_wait(self):
+        # test waiting returns once every analysis of the file is cached
+        self.assertTrue(self.preloader.wait('second.wav'))
+        cache = AnalysisCache(self.cache_folder)
+        music_path = os.path.join(self.folder.name, 'second.wav')
+        self.assertIsNotNone(cache.load(music_path, 'length', {}))
+        self.assertIsNotNone(cache.load(music_path, 'beats', BEATS_PARAMETERS))
+        self.assertIsNotNone(cache.load(music_path, 'bands', BANDS_PARAMETERS))
+
+    def test_close(self):
+        # test closing stops every worker and every later wait
+        workers = list(self.preloader.pool._pool)
+        self.preloader.close()
+        self.assertFalse(any(worker.is_alive() for worker in workers))
+        self.assertFalse(self.preloader.dispatcher.is_alive())
+        self.assertFalse(self.preloader.wait('first.wav'))
+
+if __name__ == '__main__':
+    unittest.main()
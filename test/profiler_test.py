@@ -0,0 +1,94 @@
+import unittest
+import os, sys
+import csv
+import json
+import time
+import tempfile
+path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if path not in sys.path:
+    sys.path.append(path)
+from model.profiler import StageTimer
+
+FRAME_NUM = 10
+
+def record_frames(timer, stage_names):
+    for _ in range(FRAME_NUM):
+        timer.start_frame()
+        for name in stage_names:
+            timer.stage(name)
+
+class StageTimerTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_record_stages(self):
+        # test every stage of every frame is recorded, also stages that start later
+        timer = StageTimer()
+        record_frames(timer, ['wait', 'render'])
+        record_frames(timer, ['wait', 'render', 'overlay'])
+        self.assertEqual(timer.frames, 2 * FRAME_NUM)
+        self.assertEqual(timer.names, ['wait', 'render', 'overlay'])
+        table = timer.get_table()
+        self.assertEqual(table.shape, (2 * FRAME_NUM, 3))
+        self.assertTrue((table[:FRAME_NUM, 2] == 0).all())
+        self.assertEqual(timer.get_table(5).shape, (5, 3))
+
+    def test_summary(self):
+        # test the percentiles are in order and the slowest stage is one of the stages
+        timer = StageTimer()
+        record_frames(timer, ['wait', 'render'])
+        summary = timer.summary()
+        self.assertEqual(summary['frames'], FRAME_NUM)
+        self.assertLessEqual(summary['p50'], summary['p99'])
+        self.assertIn(summary['slowest_stage'], timer.names)
+        self.assertLessEqual(summary['work_p99'], summary['p99'])
+        self.assertEqual(len(timer.get_overlay_lines()), 4)
+        self.assertEqual(StageTimer().summary(), {'frames': 0})
+
+    def test_idle_stages(self):
+        # test waiting for the next frame is no slowest stage and no work
+        timer = StageTimer()
+        for _ in range(FRAME_NUM):
+            timer.start_frame()
+            time.sleep(0.002)
+            timer.stage('wait')
+            timer.stage('render')
+        summary = timer.summary()
+        self.assertEqual(summary['slowest_stage'], 'render')
+        self.assertLess(summary['work_mean'], 1)
+        self.assertGreater(summary['mean'], 2)
+
+    def test_recent_frames(self):
+        # test only the recent frames are kept unless every frame is asked for
+        timer = StageTimer(recent_frame_num=FRAME_NUM)
+        all_timer = StageTimer(keep_all=True, recent_frame_num=FRAME_NUM)
+        for _ in range(3):
+            record_frames(timer, ['wait', 'render'])
+            record_frames(all_timer, ['wait', 'render'])
+        self.assertEqual(timer.frames, 3 * FRAME_NUM)
+        self.assertEqual(timer.get_table().shape, (FRAME_NUM, 2))
+        self.assertEqual(all_timer.get_table().shape, (3 * FRAME_NUM, 2))
+        self.assertEqual(all_timer.get_table(5).shape, (5, 2))
+
+    def test_save(self):
+        # test the stage times are dumped as a csv table and a json summary
+        timer = StageTimer()
+        record_frames(timer, ['wait', 'render'])
+        csv_path = os.path.join(self.folder.name, 'stats.csv')
+        json_path = os.path.join(self.folder.name, 'stats.json')
+        timer.save(csv_path)
+        timer.save(json_path)
+        with open(csv_path) as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(rows[0], ['frame', 'wait', 'render'])
+        self.assertEqual(len(rows), FRAME_NUM + 1)
+        with open(json_path) as file:
+            report = json.load(file)
+        self.assertEqual(report['summary']['frames'], FRAME_NUM)
+        self.assertEqual(list(report['stage_means']), ['wait', 'render'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import os, sys
+import pygame
+path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if path not in sys.path:
+    sys.path.append(path)
+from render import DirtyRects, TextCache, build_static_layer, render_text
+from model.track import create_tracks
+
+SCREEN_SIZE = (200, 100)
+BACKGROUND_COLOR = (10, 20, 30)
+
+class DirtyRectsTest(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        pygame.display.init()
+        self.screen = pygame.display.set_mode(SCREEN_SIZE)
+        self.background = pygame.Surface(SCREEN_SIZE)
+        self.background.fill(BACKGROUND_COLOR)
+
+    def tearDown(self):
+        pygame.display.quit()
+
+    def draw_frame(self, dirty_rects, rect):
+        dirty_rects.restore()
+        dirty_rects.update([self.screen.fill((255, 255, 255), rect)])
+
+    def test_restore_last_frame(self):
+        # test what is drawn in a frame is erased in the next one
+        dirty_rects = DirtyRects(self.screen, self.background)
+        self.draw_frame(dirty_rects, pygame.Rect(0, 0, 10, 10))
+        self.assertFalse(dirty_rects.full_redraw)
+        self.draw_frame(dirty_rects, pygame.Rect(50, 50, 10, 10))
+        self.assertEqual(self.screen.get_at((5, 5))[:3], BACKGROUND_COLOR)
+        self.assertEqual(self.screen.get_at((55, 55))[:3], (255, 255, 255))
+
+    def test_full_redraw(self):
+        # test the whole screen is redrawn after a frame that draws a large area
+        dirty_rects = DirtyRects(self.screen, self.background)
+        dirty_rects.restore()
+        dirty_rects.update([pygame.Rect(-50, 0, 200, 100)])
+        self.assertTrue(dirty_rects.full_redraw)
+        self.assertEqual(dirty_rects.last_rects, [pygame.Rect(0, 0, 150, 100)])
+        self.assertTrue(DirtyRects(self.screen, self.background, 0).full_redraw)
+
+    def test_static_layer(self):
+        # test the keys are composed on the background in the format of the screen
+        tracks = create_tracks(20, 80, [(20, -20), (60, -20)])
+        key_img = pygame.Surface((20, 20))
+        key_img.fill((255, 255, 255))
+        static_layer = build_static_layer(self.background, tracks, key_img)
+        self.assertEqual(static_layer.get_bitsize(), self.screen.get_bitsize())
+        for track in tracks.values():
+            self.assertEqual(static_layer.get_at(track.key_position)[:3], (255, 255, 255))
+        self.assertEqual(static_layer.get_at((0, 0))[:3], BACKGROUND_COLOR)
+
+class TextCacheTest(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        pygame.display.init()
+        self.screen = pygame.display.set_mode(SCREEN_SIZE)
+
+    def tearDown(self):
+        pygame.display.quit()
+
+    def test_cached(self):
+        # test a text is rendered once and the least recently used text is evicted
+        cache = TextCache(size=2)
+        surface = cache.get('PERFECT', 'perform', 'white')
+        self.assertIs(cache.get('PERFECT', 'perform', 'white'), surface)
+        cache.get('GOOD', 'perform', 'white')
+        cache.get('PERFECT', 'perform', 'white')
+        cache.get('BAD', 'perform', 'white')
+        self.assertEqual([key[1] for key in cache.surfaces], ['PERFECT', 'BAD'])
+
+    def test_digit_glyphs(self):
+        # test numbers are composed of the glyphs of their digits
+        cache = TextCache()
+        pieces = cache.get_pieces('Score:1011', 'score', 'white')
+        self.assertEqual(len(pieces), 5)
+        self.assertIs(pieces[1], pieces[3])
+        self.assertEqual(len(cache.surfaces), 3)
+
+    def test_render_text_rect(self):
+        # test the rect of a rendered text covers all of its glyphs
+        rect = render_text('Score:42', (5, 5), self.screen, 'score', 'white')
+        self.assertEqual(rect.topleft, (5, 5))
+        self.assertGreater(rect.width, 0)
+
+if __name__ == '__main__':
+    unittest.main()
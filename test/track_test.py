@@ -3,105 +3,161 @@ import os, sys
 path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if path not in sys.path:
     sys.path.append(path)
-from model.track import Track, MISS, BAD, GOOD, PERFECT
-from utils import add_update_circle
+from model.track import Track, MISS, BAD, GOOD, PERFECT, DEFAULT_CIRCLE, create_tracks, get_circle_positions
+from utils import add_update_circle, VELOCITY
+
+# perform lasts for 150 ms in tests
+PERFORM_DURATION = 150
 
 def create_track():
     HEIGHT = 1000
     return Track(0,HEIGHT,(0,0))
 
+def update_perform(track: Track, time):
+    track.update_circles(time, VELOCITY)
+    track.update_perform(PERFORM_DURATION)
+
 class TrackTest(unittest.TestCase):
     def test_track_circles(self):
         # test track handles correct amount of circles
-        FIRST_UPDATE = 20
-        SECOND_UPDATE = 50
+        FIRST_ARRIVAL = 500
+        SECOND_ARRIVAL = 800
         track = create_track()
-        add_update_circle(track, FIRST_UPDATE)
-        add_update_circle(track, SECOND_UPDATE)
+        add_update_circle(track, FIRST_ARRIVAL)
+        add_update_circle(track, SECOND_ARRIVAL)
         self.assertEqual(len(track.get_circles()), 2)
     
     def test_track_circles_position(self):
         # test track has circles at correct position
-        FIRST_UPDATE = 20
-        SECOND_UPDATE = 50
+        FIRST_ARRIVAL = 500
+        SECOND_ARRIVAL = 800
+        TIME = 200
+        track = create_track()
+        add_update_circle(track, FIRST_ARRIVAL)
+        add_update_circle(track, SECOND_ARRIVAL, TIME)
+        # circles move 1 px per ms and reach the key at the height of 1000
+        self.assertEqual([(0,700), (0,400)], track.get_circles())
+
+    def test_track_circles_frame_rate(self):
+        # test positions only depend on the time rather than the num of updates
         track = create_track()
-        add_update_circle(track, FIRST_UPDATE)
-        add_update_circle(track, SECOND_UPDATE)
-        self.assertEqual([(0,FIRST_UPDATE+SECOND_UPDATE), (0,SECOND_UPDATE)],
-                          track.get_circles())
+        other_track = create_track()
+        add_update_circle(track, 800)
+        add_update_circle(other_track, 800)
+        for time in range(0, 300, 7):
+            track.update_circles(time, VELOCITY)
+        track.update_circles(300, VELOCITY)
+        other_track.update_circles(300, VELOCITY)
+        self.assertEqual(track.get_circles(), other_track.get_circles())
 
     def test_track_remove_circle(self):
         # test track remove circles correctly
-        FIRST_UPDATE = 20
-        SECOND_UPDATE = 50
+        FIRST_ARRIVAL = 500
+        SECOND_ARRIVAL = 800
         track = create_track()
-        add_update_circle(track, FIRST_UPDATE)
-        add_update_circle(track, SECOND_UPDATE)
+        add_update_circle(track, FIRST_ARRIVAL)
+        add_update_circle(track, SECOND_ARRIVAL)
         track.remove_circle()
-        self.assertEqual(track.get_circles(), [(0,SECOND_UPDATE)])
+        self.assertEqual(track.get_front_circle(), SECOND_ARRIVAL)
+        self.assertEqual(track.get_circles(), [(0,200)])
     
+    def test_track_many_circles(self):
+        # test circles are kept in order without overwriting when the buffer grows
+        CIRCLE_NUM = 100
+        track = create_track()
+        arrival_times = []
+        for index in range(CIRCLE_NUM):
+            add_update_circle(track, index * 10)
+            arrival_times.append(index * 10)
+            # remove some circles so that the buffer wraps around
+            if index % 3 == 0:
+                track.remove_circle()
+                arrival_times.pop(0)
+        self.assertEqual(list(track.get_arrival_times()), arrival_times)
+        self.assertEqual(track.get_front_circle(), arrival_times[0])
+
+    def test_track_remove_all(self):
+        # test an empty track has no front circle
+        track = create_track()
+        add_update_circle(track, 500)
+        track.remove_circle()
+        track.remove_circle()
+        self.assertEqual(track.get_circles(), [])
+        self.assertEqual(track.get_front_circle(), DEFAULT_CIRCLE)
+
     def test_update_miss_simple(self):
         # test track can set and update miss state
         track = create_track()
         track.set_miss()
-        track.update_perform(1)
+        update_perform(track, 100)
         self.assertEqual(track.perform, MISS)
-        track.update_perform(1)
+        update_perform(track, 200)
         self.assertNotEqual(track.perform, MISS)
     
     def test_update_miss_hard(self):
         # test track can handle complex set/update miss command
         track = create_track()
         track.set_miss()
-        track.update_perform(1)
+        update_perform(track, 100)
         self.assertEqual(track.perform, MISS)
         track.set_miss()
-        track.update_perform(1)
+        update_perform(track, 200)
         self.assertEqual(track.perform, MISS)
-        track.update_perform(1)
+        update_perform(track, 300)
         self.assertNotEqual(track.perform, MISS)
     
     def test_update_bad(self):
         # test track can set and update bad state
         track = create_track()
         track.set_bad()
-        track.update_perform(1)
+        update_perform(track, 100)
         self.assertEqual(track.perform, BAD)
-        track.update_perform(1)
+        update_perform(track, 200)
         self.assertNotEqual(track.perform, BAD)
     
     def test_update_good(self):
         # test track can set and update good state
         track = create_track()
         track.set_good()
-        track.update_perform(1)
+        update_perform(track, 100)
         self.assertEqual(track.perform, GOOD)
-        track.update_perform(1)
+        update_perform(track, 200)
         self.assertNotEqual(track.perform, GOOD)
     
     def test_update_perfect(self):
         # test track can set and update perfect state
         track = create_track()
         track.set_perfect()
-        track.update_perform(1)
+        update_perform(track, 100)
         self.assertEqual(track.perform, PERFECT)
-        track.update_perform(1)
+        update_perform(track, 200)
         self.assertNotEqual(track.perform, PERFECT)
     
     def test_update_mixture(self):
         # test track can handle mixed perform flags
         track = create_track()
         track.set_perfect()
-        track.update_perform(1)
+        update_perform(track, 100)
         self.assertEqual(track.perform, PERFECT)
         track.set_good()
-        track.update_perform(1)
+        update_perform(track, 200)
         self.assertEqual(track.perform, GOOD)
-        track.update_perform(1)
+        update_perform(track, 300)
         self.assertNotEqual(track.perform, GOOD)
         track.set_bad()
-        track.update_perform(1)
+        update_perform(track, 400)
         self.assertEqual(track.perform, BAD)
 
+    def test_circle_positions(self):
+        # test the positions of circles of all tracks are the ones of every track
+        tracks = create_tracks(10, 1000, [(0, -10), (10, -10), (20, -10)])
+        tracks[3].add_circle(900)
+        tracks[1].add_circle(800)
+        tracks[1].add_circle(1200)
+        tracks[1].update_circles(500, VELOCITY)
+        expected = [position for track in tracks.values() for position in track.get_circles()]
+        self.assertEqual(sorted(map(tuple, get_circle_positions(tracks).tolist())), sorted(expected))
+        self.assertEqual(get_circle_positions({1: create_track()}).shape, (0, 2))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
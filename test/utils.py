@@ -2,15 +2,15 @@ import os, sys
 path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if path not in sys.path:
     sys.path.append(path)
-from model.track import Track
+from model.track import Track, create_tracks
 
-def add_update_circle(track: Track, velocity):
-    track.add_circle()
-    track.update_circles(velocity)
+# velocity of circles in px per sec
+VELOCITY = 1000
+
+def add_update_circle(track: Track, arrival_time, time=0, velocity=VELOCITY):
+    track.add_circle(arrival_time)
+    track.update_circles(time, velocity)
 
 def get_track_dict(num, height=1000):
-    tracks = {}
-    for track_index in range(1, num+1):
-        tracks[track_index] = Track(width=0, height=height,
-                                    position=(5*(track_index-1), 0))
-    return tracks
\ No newline at end of file
+    positions = [(5*(track_index-1), 0) for track_index in range(1, num+1)]
+    return create_tracks(0, height, positions)
\ No newline at end of file